@@ -4,27 +4,45 @@ Simple and straightforward - includes all routes.
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from pathlib import Path
+import anyio
+from config import settings
 from db.database import init_db
+from api.static import CachedStaticFiles
+from api.middleware import SelectiveGZipMiddleware
 from api.routes import projects, images, active_learning, annotations, training, export, serve
 
 
+# Uvicorn workers when WEB_CONCURRENCY is unset. Kept small: every worker
+# loads torch/transformers/ultralytics/faiss, caches vector stores and
+# opens its own DB pool
+DEFAULT_WEB_CONCURRENCY = 2
+
 # Create FastAPI app
 app = FastAPI(
     title="Auto-Annotation Platform API",
     description="Intelligent annotation platform with active learning and few-shot detection",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=settings.CORS_METHODS,
+    allow_headers=settings.CORS_HEADERS,
+    max_age=settings.CORS_MAX_AGE,
+)
+
+# Compress JSON responses (images and static files are served precompressed/as-is)
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=1024,
+    exclude_prefixes=("/api/serve/", "/static/"),
+    exclude_suffixes=("/download", "/stream"),
 )
 
 # Include API routers
@@ -39,17 +57,27 @@ app.include_router(serve.router, prefix="/api")
 # Serve static frontend files
 FRONTEND_DIR = Path("/frontend/static")
 if FRONTEND_DIR.exists():
-    app.mount("/static", StaticFiles(directory=str(FRONTEND_DIR)), name="static")
+    app.mount(
+        "/static",
+        CachedStaticFiles(directory=str(FRONTEND_DIR), max_age=settings.STATIC_MAX_AGE),
+        name="static"
+    )
 
 
 @app.on_event("startup")
 def startup():
-    """Initialize database on startup."""
+    """Initialize database on startup (safe to run from every worker)."""
     print("Starting Auto-Annotation Platform API...")
     init_db()
     print("Database initialized!")
 
 
+@app.on_event("startup")
+async def configure_threadpool():
+    """Raise the AnyIO threadpool size used for sync handlers."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+
+
 @app.get("/")
 def root():
     """Serve the frontend SPA."""
@@ -71,4 +99,13 @@ def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = settings.WEB_CONCURRENCY or DEFAULT_WEB_CONCURRENCY
+    # Import string (not the app object) is required for multiple workers
+    uvicorn.run(
+        "api.main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=workers,
+        loop="uvloop",
+        http="httptools"
+    )
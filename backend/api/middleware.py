@@ -0,0 +1,29 @@
+"""
+Custom middleware.
+"""
+from starlette.middleware.gzip import GZipMiddleware
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """
+    GZip responses except under excluded path prefixes or suffixes.
+    Used to skip images (already compressed, and wrapping them would lose
+    uvicorn's sendfile path), endpoints that serve precompressed files,
+    and event streams (the gzip buffer would hold back each event).
+    """
+
+    def __init__(
+        self, app, minimum_size: int = 1024, compresslevel: int = 6,
+        exclude_prefixes: tuple = (), exclude_suffixes: tuple = ()
+    ):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.exclude_prefixes = tuple(exclude_prefixes)
+        self.exclude_suffixes = tuple(exclude_suffixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and (
+            scope["path"].startswith(self.exclude_prefixes) or scope["path"].endswith(self.exclude_suffixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
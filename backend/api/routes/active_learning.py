@@ -7,7 +7,7 @@ from typing import List
 from db.database import get_db
 from db import crud
 from db.models import ImageStatus
-from core.embedding_generator import FAISSVectorStore
+from core.embedding_generator import get_vector_store
 from core.active_learning import ActiveLearningSelector
 
 
@@ -30,10 +30,10 @@ def get_next_batch(
         raise HTTPException(status_code=404, detail="Project not found")
     
     try:
-        # Load embeddings from FAISS
-        vector_store = FAISSVectorStore(project_id)
+        # Load embeddings from FAISS (cached in-process until the index changes)
+        vector_store = get_vector_store(project_id)
         
-        if vector_store.index.ntotal == 0:
+        if not vector_store.image_ids:
             raise HTTPException(
                 status_code=400, 
                 detail="No embeddings found. Please generate embeddings first."
@@ -44,8 +44,7 @@ def get_next_batch(
         all_embeddings = vector_store.get_all_embeddings()
         
         # Get annotated image IDs
-        annotated_images = crud.get_project_images(db, project_id, status=ImageStatus.ANNOTATED)
-        annotated_ids = set(img.id for img in annotated_images)
+        annotated_ids = set(crud.get_project_image_ids(db, project_id, status=ImageStatus.ANNOTATED))
         
         # Select next batch
         selector = ActiveLearningSelector()
@@ -58,11 +57,10 @@ def get_next_batch(
         )
         
         # Update selected images status
-        for img_id in selected_ids:
-            crud.update_image_status(db, img_id, ImageStatus.SELECTED)
+        crud.update_images_status(db, selected_ids, ImageStatus.SELECTED)
         
         # Get image details
-        selected_images = [crud.get_image(db, img_id) for img_id in selected_ids]
+        selected_images = crud.get_images(db, selected_ids)
         
         return {
             "selected": len(selected_ids),
@@ -1,17 +1,26 @@
 """
 Annotation routes - save and retrieve annotations.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import List
 from db.database import get_db
 from db import crud
-from db.models import ImageStatus
-from api.schemas import AnnotationCreate, AnnotationResponse, ClassCreate, ClassResponse
+from db.models import ImageStatus, Class as ClassModel
+from api.schemas import (
+    AnnotationCreate, AnnotationResponse, ClassCreate, ClassResponse, AnnotationBatchAdapter
+)
 
 
 router = APIRouter(prefix="/annotations", tags=["annotations"])
 
+# Reject batch bodies larger than this (bytes)
+MAX_BATCH_BODY_SIZE = 50 * 1024 * 1024
+
 
 # ==================== Class Management ====================
 
@@ -29,17 +38,22 @@ def create_class(project_id: str, class_data: ClassCreate, db: Session = Depends
 @router.get("/{project_id}/classes", response_model=List[ClassResponse])
 def list_classes(project_id: str, db: Session = Depends(get_db)):
     """Get all classes for a project."""
-    return crud.get_project_classes(db, project_id)
+    classes = crud.get_project_classes(db, project_id)
+    return ORJSONResponse([
+        {"id": c.id, "project_id": c.project_id, "name": c.name, "color": c.color}
+        for c in classes
+    ])
 
 
 @router.delete("/{project_id}/classes/{class_id}")
 def delete_class(project_id: str, class_id: int, db: Session = Depends(get_db)):
     """Delete a class from a project."""
-    from db.models import Class as ClassModel
     cls = db.query(ClassModel).filter(ClassModel.id == class_id, ClassModel.project_id == project_id).first()
     if not cls:
         raise HTTPException(status_code=404, detail="Class not found")
     db.delete(cls)
+    crud.bump_annotations_version(db, project_id)
+    crud.bump_classes_version(db, project_id)
     db.commit()
     return {"message": f"Class '{cls.name}' deleted"}
 
@@ -78,7 +92,19 @@ def create_annotation(annotation: AnnotationCreate, db: Session = Depends(get_db
 @router.get("/image/{image_id}", response_model=List[AnnotationResponse])
 def get_image_annotations(image_id: str, db: Session = Depends(get_db)):
     """Get all annotations for an image."""
-    return crud.get_image_annotations(db, image_id)
+    # Serialize directly; skips per-row Pydantic validation
+    return ORJSONResponse([
+        {
+            "id": ann.id,
+            "image_id": ann.image_id,
+            "class_id": ann.class_id,
+            "bbox": ann.bbox,
+            "confidence": ann.confidence,
+            "source": ann.source,
+            "created_at": ann.created_at
+        }
+        for ann in crud.get_image_annotations(db, image_id)
+    ])
 
 
 @router.delete("/image/{image_id}")
@@ -93,26 +119,44 @@ def delete_image_annotations(image_id: str, db: Session = Depends(get_db)):
 
 
 @router.post("/batch")
-def create_batch_annotations(annotations: List[AnnotationCreate], db: Session = Depends(get_db)):
-    """Create multiple annotations at once."""
-    created = []
+async def create_batch_annotations(request: Request, db: Session = Depends(get_db)):
+    """
+    Create multiple annotations at once.
+    Body: list of AnnotationCreate objects. Parsed and validated in one pass
+    straight into plain dicts, which go to the bulk insert as-is.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length:
+        try:
+            declared_size = int(content_length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length")
+        if declared_size > MAX_BATCH_BODY_SIZE:
+            raise HTTPException(status_code=413, detail="Batch too large")
+    
+    body = await request.body()
+    if len(body) > MAX_BATCH_BODY_SIZE:
+        raise HTTPException(status_code=413, detail="Batch too large")
+    
+    try:
+        annotations = AnnotationBatchAdapter.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
     
+    created = await run_in_threadpool(crud.create_annotations_bulk, db, annotations)
+    
+    # Update image status based on source (last annotation per image wins)
+    new_status = {}
     for ann in annotations:
-        db_ann = crud.create_annotation(
-            db,
-            image_id=ann.image_id,
-            class_id=ann.class_id,
-            bbox=ann.bbox.model_dump(),
-            confidence=ann.confidence,
-            source=ann.source
-        )
-        created.append(db_ann.id)
-        
-        # Update image status based on source
-        if ann.source == "corrected":
-            crud.update_image_status(db, ann.image_id, ImageStatus.CORRECTED)
-        elif ann.source == "manual":
-            crud.update_image_status(db, ann.image_id, ImageStatus.ANNOTATED)
+        source = ann.get("source", "manual")
+        if source == "corrected":
+            new_status[ann["image_id"]] = ImageStatus.CORRECTED
+        elif source == "manual":
+            new_status[ann["image_id"]] = ImageStatus.ANNOTATED
+    
+    for status in (ImageStatus.CORRECTED, ImageStatus.ANNOTATED):
+        ids = [img_id for img_id, s in new_status.items() if s == status]
+        await run_in_threadpool(crud.update_images_status, db, ids, status)
     
     return {
         "created": len(created),
@@ -1,8 +1,9 @@
 """
 Export routes - export annotations in various formats.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pathlib import Path
 from db.database import get_db
@@ -21,29 +22,22 @@ def export_yolo(project_id: str, db: Session = Depends(get_db)):
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    # Reuse the previous export if nothing changed since
+    project_dir = Path(settings.DATA_DIR) / "projects" / project_id
+    exporter = AnnotationExporter(project_id, str(project_dir))
+    version = project.annotations_version
+    if exporter.get_export_version("yolo_export") == version:
+        return {
+            "message": "YOLO export completed",
+            "path": str(exporter.export_dir / "yolo_export"),
+            "cached": True
+        }
+    
     # Get all images and annotations
-    images = crud.get_project_images(db, project_id)
+    images = crud.get_project_images_lite(db, project_id)
     classes = crud.get_project_classes(db, project_id)
     
-    all_annotations = []
-    for img in images:
-        anns = crud.get_image_annotations(db, img.id)
-        for ann in anns:
-            all_annotations.append({
-                "image_id": ann.image_id,
-                "class_id": ann.class_id,
-                "bbox": ann.bbox
-            })
-    
-    # Convert to dict format
-    images_dict = [
-        {
-            "id": img.id,
-            "filename": img.filename,
-            "file_path": img.file_path
-        }
-        for img in images
-    ]
+    all_annotations = crud.get_project_annotations(db, project_id)
     
     classes_dict = [
         {"id": cls.id, "name": cls.name}
@@ -51,13 +45,13 @@ def export_yolo(project_id: str, db: Session = Depends(get_db)):
     ]
     
     # Export
-    project_dir = Path(settings.DATA_DIR) / "projects" / project_id
-    exporter = AnnotationExporter(project_id, str(project_dir))
-    export_path = exporter.export_yolo(images_dict, all_annotations, classes_dict)
+    export_path = exporter.export_yolo(images, all_annotations, classes_dict)
+    exporter.set_export_version("yolo_export", version)
     
     return {
         "message": "YOLO export completed",
-        "path": export_path
+        "path": export_path,
+        "cached": False
     }
 
 
@@ -68,31 +62,23 @@ def export_coco(project_id: str, db: Session = Depends(get_db)):
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    # Reuse the previous export if nothing changed since
+    project_dir = Path(settings.DATA_DIR) / "projects" / project_id
+    exporter = AnnotationExporter(project_id, str(project_dir))
+    version = project.annotations_version
+    if exporter.get_export_version("coco_export.json") == version:
+        return {
+            "message": "COCO export completed",
+            "path": str(exporter.export_dir / "coco_export.json"),
+            "download_url": f"/export/{project_id}/coco/download",
+            "cached": True
+        }
+    
     # Get all images and annotations
-    images = crud.get_project_images(db, project_id)
+    images = crud.get_project_images_lite(db, project_id, with_size=True)
     classes = crud.get_project_classes(db, project_id)
     
-    all_annotations = []
-    for img in images:
-        anns = crud.get_image_annotations(db, img.id)
-        for ann in anns:
-            all_annotations.append({
-                "image_id": ann.image_id,
-                "class_id": ann.class_id,
-                "bbox": ann.bbox
-            })
-    
-    # Convert to dict format
-    images_dict = [
-        {
-            "id": img.id,
-            "filename": img.filename,
-            "file_path": img.file_path,
-            "width": img.width,
-            "height": img.height
-        }
-        for img in images
-    ]
+    all_annotations = crud.get_project_annotations(db, project_id)
     
     classes_dict = [
         {"id": cls.id, "name": cls.name}
@@ -100,28 +86,46 @@ def export_coco(project_id: str, db: Session = Depends(get_db)):
     ]
     
     # Export
-    project_dir = Path(settings.DATA_DIR) / "projects" / project_id
-    exporter = AnnotationExporter(project_id, str(project_dir))
-    export_path = exporter.export_coco(images_dict, all_annotations, classes_dict)
+    export_path = exporter.export_coco(images, all_annotations, classes_dict)
+    exporter.set_export_version("coco_export.json", version)
     
     return {
         "message": "COCO export completed",
         "path": export_path,
-        "download_url": f"/export/{project_id}/coco/download"
+        "download_url": f"/export/{project_id}/coco/download",
+        "cached": False
     }
 
 
 @router.get("/{project_id}/coco/download")
-def download_coco(project_id: str):
-    """Download COCO export file."""
+async def download_coco(project_id: str, request: Request):
+    """Download COCO export file (gzipped if the client accepts it)."""
     project_dir = Path(settings.DATA_DIR) / "projects" / project_id
     coco_file = project_dir / "exports" / "coco_export.json"
+    gz_file = project_dir / "exports" / "coco_export.json.gz"
+    version_file = project_dir / "exports" / ".coco_export.json.version"
     
-    if not coco_file.exists():
+    if not await run_in_threadpool(coco_file.exists):
         raise HTTPException(status_code=404, detail="Export file not found")
     
+    headers = {"Vary": "Accept-Encoding"}
+    if await run_in_threadpool(version_file.exists):
+        version = (await run_in_threadpool(version_file.read_text)).strip()
+        headers["ETag"] = f'"coco-{version}"'
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+    
+    if "gzip" in request.headers.get("accept-encoding", "") and await run_in_threadpool(gz_file.exists):
+        return FileResponse(
+            path=str(gz_file),
+            filename=f"{project_id}_coco.json",
+            media_type="application/json",
+            headers={**headers, "Content-Encoding": "gzip"}
+        )
+    
     return FileResponse(
         path=str(coco_file),
         filename=f"{project_id}_coco.json",
-        media_type="application/json"
+        media_type="application/json",
+        headers=headers
     )
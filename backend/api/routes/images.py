@@ -2,78 +2,88 @@
 Image routes - upload and manage images.
 """
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import List
-import shutil
 from pathlib import Path
+import asyncio
+import aiofiles
 from db.database import get_db
 from db import crud
+from db.models import Image, Embedding, ImageStatus
 from api.schemas import ImageResponse
 from core.dataset_processor import DatasetProcessor
 from tasks.celery_app import generate_embeddings_task
+from tasks.tracking import register_task
 
 
 router = APIRouter(prefix="/images", tags=["images"])
 
+# Read uploads in 1 MB chunks so large files don't sit in memory
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Max files processed concurrently per upload request (bounds open FDs)
+UPLOAD_CONCURRENCY = 8
+
 
 @router.post("/{project_id}/upload")
-def upload_images(
+async def upload_images(
     project_id: str,
     files: List[UploadFile] = File(...),
     db: Session = Depends(get_db)
 ):
     """Upload images to a project."""
     # Check project exists
-    project = crud.get_project(db, project_id)
+    project = await run_in_threadpool(crud.get_project, db, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Initialize processor
     processor = DatasetProcessor(project_id)
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+    
+    async def _process_one(file: UploadFile) -> dict:
+        """Stream, validate and store one upload. Returns processor result."""
+        async with semaphore:
+            staging_path = None
+            try:
+                # Stream upload straight into the project's images directory
+                staging_path = processor.get_staging_path()
+                async with aiofiles.open(staging_path, "wb") as f:
+                    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                        await f.write(chunk)
+                
+                # Validate and rename into place (PIL header read is blocking)
+                return await run_in_threadpool(
+                    processor.process_uploaded_file, staging_path, file.filename, move=True
+                )
+            
+            finally:
+                # Drop the staging file if it wasn't moved into place
+                if staging_path:
+                    Path(staging_path).unlink(missing_ok=True)
+    
+    results = await asyncio.gather(*[_process_one(f) for f in files], return_exceptions=True)
     
     uploaded = []
     errors = []
+    for file, result in zip(files, results):
+        if isinstance(result, Exception):
+            errors.append({"filename": file.filename, "error": str(result)})
+        elif not result["success"]:
+            errors.append({"filename": file.filename, "error": result["error"]})
+        else:
+            uploaded.append(result)
     
-    for file in files:
-        try:
-            # Save uploaded file temporarily
-            temp_path = f"/tmp/{file.filename}"
-            with open(temp_path, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-            
-            # Process the file
-            result = processor.process_uploaded_file(temp_path, file.filename)
-            
-            if result["success"]:
-                # Create image record in DB
-                img = crud.create_image(
-                    db,
-                    project_id=project_id,
-                    filename=result["filename"],
-                    file_path=result["file_path"],
-                    width=result["width"],
-                    height=result["height"]
-                )
-                uploaded.append(img.filename)
-            else:
-                errors.append({
-                    "filename": file.filename,
-                    "error": result["error"]
-                })
-            
-            # Clean up temp file
-            Path(temp_path).unlink(missing_ok=True)
-        
-        except Exception as e:
-            errors.append({
-                "filename": file.filename,
-                "error": str(e)
-            })
+    # Create all image records in DB at once
+    if uploaded:
+        await run_in_threadpool(crud.create_images_bulk, db, project_id, uploaded)
     
     return {
         "uploaded": len(uploaded),
         "errors": len(errors),
-        "files": uploaded,
+        "files": [r["filename"] for r in uploaded],
         "error_details": errors
     }
 
@@ -81,8 +91,6 @@ def upload_images(
 @router.get("/{project_id}", response_model=List[ImageResponse])
 def list_images(project_id: str, status: str = None, db: Session = Depends(get_db)):
     """Get all images for a project, optionally filtered by status."""
-    from db.models import ImageStatus
-    
     status_enum = None
     if status:
         try:
@@ -91,16 +99,32 @@ def list_images(project_id: str, status: str = None, db: Session = Depends(get_d
             raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
     
     images = crud.get_project_images(db, project_id, status=status_enum)
-    return images
+    # Serialize directly; skips per-row Pydantic validation on large projects
+    return ORJSONResponse([
+        {
+            "id": img.id,
+            "project_id": img.project_id,
+            "filename": img.filename,
+            "file_path": img.file_path,
+            "width": img.width,
+            "height": img.height,
+            "status": img.status,
+            "created_at": img.created_at
+        }
+        for img in images
+    ])
 
 
 @router.get("/{project_id}/embedding-stats")
 def get_embedding_stats(project_id: str, db: Session = Depends(get_db)):
     """Get embedding statistics for a project."""
-    from db.models import Image, Embedding
-    
-    total = db.query(Image).filter(Image.project_id == project_id).count()
-    with_embeddings = db.query(Embedding).join(Image).filter(Image.project_id == project_id).count()
+    # Single round-trip: count images and their embeddings together
+    total, with_embeddings = db.execute(
+        select(func.count(Image.id), func.count(Embedding.id))
+        .select_from(Image)
+        .outerjoin(Embedding, Embedding.image_id == Image.id)
+        .where(Image.project_id == project_id)
+    ).one()
     
     return {
         "total": total,
@@ -119,6 +143,7 @@ def generate_embeddings(project_id: str, db: Session = Depends(get_db)):
     
     # Start Celery task
     task = generate_embeddings_task.delay(project_id)
+    register_task(task.id, project_id)
     
     return {
         "message": "Embedding generation started",
@@ -2,6 +2,7 @@
 Project routes - CRUD operations for projects.
 """
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import List
 from db.database import get_db
@@ -22,7 +23,19 @@ def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
 @router.get("/", response_model=List[ProjectResponse])
 def list_projects(db: Session = Depends(get_db)):
     """Get all projects."""
-    return crud.get_all_projects(db)
+    projects = crud.get_all_projects(db)
+    # Serialize directly; skips per-row Pydantic validation
+    return ORJSONResponse([
+        {
+            "id": p.id,
+            "name": p.name,
+            "description": p.description,
+            "status": p.status,
+            "created_at": p.created_at,
+            "updated_at": p.updated_at
+        }
+        for p in projects
+    ])
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
@@ -1,45 +1,185 @@
 """
 Serve routes - serve image files to the frontend.
 """
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+import hashlib
+import os
+import time
+from config import settings
 from db.database import get_db
 from db import crud
 
 
 router = APIRouter(prefix="/serve", tags=["serve"])
 
+# Images are immutable once uploaded, so let browsers keep them for a day
+IMAGE_CACHE_CONTROL = "public, max-age=86400"
+# Max number of image_id -> file info entries kept in memory
+FILE_INFO_CACHE_SIZE = 4096
+# Seconds a cached entry is served without re-checking the image row, so a
+# deleted image (or project) stops being served soon after in every worker
+FILE_INFO_RECHECK_SECONDS = 30
 
-@router.get("/image/{image_id}")
-def serve_image(image_id: str, db: Session = Depends(get_db)):
-    """Serve an image file by its ID."""
-    image = crud.get_image(db, image_id)
-    if not image:
-        raise HTTPException(status_code=404, detail="Image not found")
-    
-    file_path = Path(image.file_path)
+DATA_DIR = Path(settings.DATA_DIR)
+
+MEDIA_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".bmp": "image/bmp",
+    ".webp": "image/webp",
+    ".tiff": "image/tiff",
+}
+
+
+class FileInfo(NamedTuple):
+    """Resolved on-disk file for an image plus its validators."""
+    path: Path
+    mtime: float
+    size: int
+    etag: str
+
+
+# image_id -> (file info, time.monotonic() of the last DB check)
+_file_info_cache: "OrderedDict[str, Tuple[FileInfo, float]]" = OrderedDict()
+
+
+@lru_cache(maxsize=4096)
+def _remap_legacy_path(stored_path: str) -> Optional[Path]:
+    """Rebuild a stored path under the current DATA_DIR (handles old DB entries)."""
+    parts = stored_path.replace('\\', '/')
+    if 'projects/' in parts:
+        rel = parts[parts.index('projects/'):]
+        return DATA_DIR / rel
+    return None
+
+
+def _resolve_file_path(stored_path: str) -> Optional[Path]:
+    """Resolve an image path on disk, returning None if it can't be found."""
+    file_path = Path(stored_path)
     if not file_path.exists():
         # Handle path mismatch from old DB entries
-        from config import settings
-        parts = str(file_path).replace('\\', '/')
-        if 'projects/' in parts:
-            rel = parts[parts.index('projects/'):]
-            file_path = Path(settings.DATA_DIR) / rel
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Image file not found on disk")
-    
-    # Determine media type
-    suffix = file_path.suffix.lower()
-    media_types = {
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".png": "image/png",
-        ".bmp": "image/bmp",
-        ".webp": "image/webp",
-        ".tiff": "image/tiff",
+        file_path = _remap_legacy_path(stored_path)
+    if file_path is None or not file_path.exists():
+        return None
+    return file_path
+
+
+def _stat_file(file_path: Path) -> Optional[FileInfo]:
+    """Stat a file and build its ETag (same scheme as Starlette: mtime-size)."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    etag = hashlib.md5(f"{stat.st_mtime}-{stat.st_size}".encode()).hexdigest()
+    return FileInfo(file_path, stat.st_mtime, stat.st_size, f'"{etag}"')
+
+
+def _cache_file_info(image_id: str, info: FileInfo, checked_at: float):
+    """Insert into the bounded LRU of file info."""
+    _file_info_cache[image_id] = (info, checked_at)
+    _file_info_cache.move_to_end(image_id)
+    if len(_file_info_cache) > FILE_INFO_CACHE_SIZE:
+        _file_info_cache.popitem(last=False)
+
+
+class RangeNotSatisfiable(Exception):
+    """A valid byte range that lies entirely outside the file (answered with 416)."""
+
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single 'bytes=start-end' range.
+    Returns: (start, end) inclusive, or None if the header is malformed or
+    unsupported (multiple ranges, other units): per RFC 9110 it's then
+    ignored and the full file served.
+    Raises RangeNotSatisfiable for a well-formed range past the end of the file.
+    """
+    if not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    start_str, _, end_str = range_header[6:].strip().partition("-")
+    if not (start_str.isdigit() or start_str == "") or not (end_str.isdigit() or end_str == ""):
+        return None
+    if start_str == "":
+        if end_str == "":
+            return None
+        # Suffix range: last N bytes
+        length = int(end_str)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(start_str)
+    if end_str and int(end_str) < start:
+        return None  # Invalid range-spec
+    if start >= size:
+        raise RangeNotSatisfiable()
+    end = min(int(end_str), size - 1) if end_str else size - 1
+    return start, end
+
+
+def _read_range(file_path: Path, start: int, end: int) -> bytes:
+    """Read bytes [start, end] from a file."""
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start + 1)
+
+
+@router.get("/image/{image_id}")
+async def serve_image(image_id: str, request: Request, db: Session = Depends(get_db)):
+    """Serve an image file by its ID."""
+    # Fast path: recently checked file, only re-stat it to catch changes
+    info = None
+    cached = _file_info_cache.get(image_id)
+    checked_at = cached[1] if cached else 0.0
+    if cached and time.monotonic() - checked_at < FILE_INFO_RECHECK_SECONDS:
+        info = await run_in_threadpool(_stat_file, cached[0].path)
+        if info is None:
+            _file_info_cache.pop(image_id, None)
+
+    if info is None:
+        image = await run_in_threadpool(crud.get_image, db, image_id)
+        if not image:
+            _file_info_cache.pop(image_id, None)
+            raise HTTPException(status_code=404, detail="Image not found")
+        checked_at = time.monotonic()
+
+        file_path = await run_in_threadpool(_resolve_file_path, image.file_path)
+        info = await run_in_threadpool(_stat_file, file_path) if file_path else None
+        if info is None:
+            raise HTTPException(status_code=404, detail="Image file not found on disk")
+    _cache_file_info(image_id, info, checked_at)
+
+    headers = {
+        "Cache-Control": IMAGE_CACHE_CONTROL,
+        "ETag": info.etag,
+        "Accept-Ranges": "bytes",
     }
-    media_type = media_types.get(suffix, "image/jpeg")
-    
-    return FileResponse(path=str(file_path), media_type=media_type)
+
+    if request.headers.get("if-none-match") == info.etag:
+        return Response(status_code=304, headers=headers)
+
+    # Determine media type
+    media_type = MEDIA_TYPES.get(info.path.suffix.lower(), "image/jpeg")
+
+    range_header = request.headers.get("range")
+    byte_range = None
+    if range_header:
+        try:
+            byte_range = _parse_range(range_header, info.size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{info.size}"})
+    if byte_range is not None:
+        start, end = byte_range
+        body = await run_in_threadpool(_read_range, info.path, start, end)
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+        return Response(content=body, status_code=206, headers=headers, media_type=media_type)
+
+    # FileResponse keeps uvicorn's sendfile fast path for full-body responses
+    return FileResponse(path=str(info.path), media_type=media_type, headers=headers)
@@ -1,16 +1,65 @@
 """
 Training routes - train models and auto-annotate.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from pathlib import Path
+from typing import Tuple
+import csv
+import aiofiles
+import orjson
+from config import settings
 from db.database import get_db
 from db import crud
-from tasks.celery_app import train_model_task, auto_annotate_task
-from celery.result import AsyncResult
+from tasks.celery_app import celery_app, train_model_task, auto_annotate_task, annotate_after_training_task
+from tasks.tracking import (
+    register_task, task_exists, async_redis_client,
+    claim_inflight, set_inflight, release_inflight, training_key, auto_annotate_key,
+    train_and_annotate_key
+)
+from celery import chain, states
+from celery.utils import uuid
+from collections import OrderedDict
 
 
 router = APIRouter(prefix="/training", tags=["training"])
 
+DATA_DIR = Path(settings.DATA_DIR)
+
+# Serialized responses for tasks in a terminal state, keyed by task_id
+_finished_tasks = OrderedDict()
+FINISHED_TASK_CACHE_SIZE = 1024
+# Seconds between keep-alive comments on an idle task stream
+STREAM_KEEPALIVE = 15
+
+
+def _start_once(key: str, project_id: str, start) -> Tuple[str, bool]:
+    """
+    Enqueue a task unless an identical one is already in flight.
+    Returns: (task_id, whether it was newly started)
+    """
+    existing = claim_inflight(key)
+    if existing:
+        # Holder finished without releasing (e.g. worker killed): take over
+        if celery_app.backend.get_task_meta(existing)["status"] in states.READY_STATES:
+            release_inflight(key, existing)
+            existing = claim_inflight(key)
+    if existing == "":
+        raise HTTPException(status_code=409, detail="Task is already being started")
+    if existing:
+        return existing, False
+    
+    try:
+        task = start()
+    except Exception:
+        release_inflight(key)
+        raise
+    set_inflight(key, task.id)
+    register_task(task.id, project_id)
+    return task.id, True
+
 
 @router.post("/{project_id}/train")
 def start_training(
@@ -24,72 +73,142 @@ def start_training(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Start training task
-    task = train_model_task.delay(project_id, epochs, batch_size)
+    # Start training task (a duplicate request gets the in-flight task back)
+    task_id, started = _start_once(
+        training_key(project_id, epochs, batch_size),
+        project_id,
+        lambda: train_model_task.delay(project_id, epochs, batch_size)
+    )
     
     return {
-        "message": "Training started",
-        "task_id": task.id
+        "message": "Training started" if started else "Training already in progress",
+        "task_id": task_id
     }
 
 
+# Parsed results.csv per path: {"ino", "mtime", "size", "offset", "epochs"}
+_results_cache = {}
+# Status message per training.log path: {"ino", "size", "status"}
+_status_cache = {}
+
+STATUS_LINES = 10
+
+
+def _parse_epoch_row(row: list):
+    """Parse one results.csv row into an epoch metrics dict (None if malformed)."""
+    if not row or not row[0].strip():
+        return None
+    vals = [v.strip() for v in row]
+    try:
+        return {
+            "epoch": int(float(vals[0])),
+            "box_loss": round(float(vals[1]), 4),
+            "cls_loss": round(float(vals[2]), 4),
+            "dfl_loss": round(float(vals[3]), 4),
+            "precision": round(float(vals[4]), 4),
+            "recall": round(float(vals[5]), 4),
+            "mAP50": round(float(vals[6]), 4),
+            "mAP50_95": round(float(vals[7]), 4),
+            "val_box_loss": round(float(vals[8]), 4),
+            "val_cls_loss": round(float(vals[9]), 4),
+            "val_dfl_loss": round(float(vals[10]), 4),
+        }
+    except (IndexError, ValueError):
+        return None
+
+
+def _parse_results_csv(results_path: Path) -> list:
+    """
+    Parse YOLOv8 results.csv into a list of per-epoch metric dicts.
+    Results are cached; only bytes appended since the last call are parsed.
+    Cache entries are never modified, only replaced: concurrent polls each
+    build a new entry from the one they read, and returned lists stay fixed.
+    """
+    stat = results_path.stat()
+    key = str(results_path)
+    cached = _results_cache.get(key)
+    
+    if cached and (cached["ino"], cached["mtime"], cached["size"]) == (stat.st_ino, stat.st_mtime, stat.st_size):
+        return cached["epochs"]
+    
+    # New file, replaced file, or truncated (new training run): start over
+    offset, epochs = 0, []
+    if cached and cached["ino"] == stat.st_ino and stat.st_size >= cached["offset"]:
+        offset, epochs = cached["offset"], list(cached["epochs"])
+    
+    with open(results_path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    
+    # Only consume complete lines; a partially written row is picked up next poll
+    complete = data[:data.rfind(b"\n") + 1]
+    lines = complete.decode(errors="replace").splitlines()
+    if offset == 0:
+        lines = lines[1:]  # Skip header
+    
+    for row in csv.reader(lines):
+        epoch_data = _parse_epoch_row(row)
+        if epoch_data:
+            epochs.append(epoch_data)
+    
+    _results_cache[key] = {
+        "ino": stat.st_ino, "mtime": stat.st_mtime, "size": stat.st_size,
+        "offset": offset + len(complete), "epochs": epochs
+    }
+    return epochs
+
+
+async def _read_status_message(log_path: Path) -> str:
+    """Build the status message from the first lines of training.log."""
+    stat = await run_in_threadpool(log_path.stat)
+    key = str(log_path)
+    cached = _status_cache.get(key)
+    # The head of the log doesn't change once written, unless it's recreated
+    if cached and cached["ino"] == stat.st_ino and stat.st_size >= cached["size"]:
+        return cached["status"]
+    
+    lines = []
+    async with aiofiles.open(log_path, "r", errors="replace") as f:
+        for _ in range(STATUS_LINES):
+            line = await f.readline()
+            if not line:
+                break
+            lines.append(line)
+    
+    # Get only non-progress-bar lines (lines that don't contain progress indicators)
+    status_lines = []
+    for line in lines:
+        clean = line.strip()
+        if clean and '|' not in clean and '%|' not in clean and 'it/s' not in clean:
+            status_lines.append(clean)
+    status_msg = '\n'.join(status_lines)
+    
+    # Only cache once all status lines are complete
+    if len(lines) == STATUS_LINES and lines[-1].endswith("\n"):
+        _status_cache[key] = {"ino": stat.st_ino, "size": stat.st_size, "status": status_msg}
+    return status_msg
+
+
 @router.get("/{project_id}/logs")
-def get_training_logs(
+async def get_training_logs(
     project_id: str,
     last_epoch: int = 0
 ):
     """Get parsed training metrics from YOLOv8 results.csv."""
-    from config import settings
-    from pathlib import Path
-    import csv
-    
-    project_dir = Path(settings.DATA_DIR) / "projects" / project_id
+    project_dir = DATA_DIR / "projects" / project_id
     results_path = project_dir / "models" / "train" / "results.csv"
     log_path = project_dir / "training.log"
+    log_exists = await run_in_threadpool(log_path.exists)
     
     # Get status message from training.log (first few lines only)
     status_msg = ""
-    if log_path.exists():
-        with open(log_path, "r", errors="replace") as f:
-            lines = f.readlines()
-            # Get only non-progress-bar lines (lines that don't contain progress indicators)
-            status_lines = []
-            for line in lines[:10]:
-                clean = line.strip()
-                if clean and '|' not in clean and '%|' not in clean and 'it/s' not in clean:
-                    status_lines.append(clean)
-            status_msg = '\n'.join(status_lines)
-    
-    # Parse results.csv for epoch metrics
+    if log_exists:
+        status_msg = await _read_status_message(log_path)
+    
+    # Parse results.csv for epoch metrics (csv.reader is sync, keep it off the loop)
     epochs = []
-    if results_path.exists():
-        with open(results_path, "r") as f:
-            reader = csv.reader(f)
-            header = next(reader, None)
-            if header:
-                # Clean header whitespace
-                header = [h.strip() for h in header]
-                for row in reader:
-                    if not row or not row[0].strip():
-                        continue
-                    vals = [v.strip() for v in row]
-                    try:
-                        epoch_data = {
-                            "epoch": int(float(vals[0])),
-                            "box_loss": round(float(vals[1]), 4),
-                            "cls_loss": round(float(vals[2]), 4),
-                            "dfl_loss": round(float(vals[3]), 4),
-                            "precision": round(float(vals[4]), 4),
-                            "recall": round(float(vals[5]), 4),
-                            "mAP50": round(float(vals[6]), 4),
-                            "mAP50_95": round(float(vals[7]), 4),
-                            "val_box_loss": round(float(vals[8]), 4),
-                            "val_cls_loss": round(float(vals[9]), 4),
-                            "val_dfl_loss": round(float(vals[10]), 4),
-                        }
-                        epochs.append(epoch_data)
-                    except (IndexError, ValueError):
-                        continue
+    if await run_in_threadpool(results_path.exists):
+        epochs = await run_in_threadpool(_parse_results_csv, results_path)
     
     # Only return new epochs
     new_epochs = [e for e in epochs if e["epoch"] > last_epoch]
@@ -98,7 +217,7 @@ def get_training_logs(
         "status": status_msg,
         "epochs": new_epochs,
         "total_epochs": len(epochs),
-        "training": log_path.exists()
+        "training": log_exists
     }
 
 
@@ -113,84 +232,166 @@ def start_auto_annotation(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Start auto-annotation task
-    task = auto_annotate_task.delay(project_id, confidence_threshold)
+    # Start auto-annotation task (a duplicate request gets the in-flight task back)
+    task_id, started = _start_once(
+        auto_annotate_key(project_id, confidence_threshold),
+        project_id,
+        lambda: auto_annotate_task.delay(project_id, confidence_threshold)
+    )
     
     return {
-        "message": "Auto-annotation started",
-        "task_id": task.id
+        "message": "Auto-annotation started" if started else "Auto-annotation already in progress",
+        "task_id": task_id
     }
 
 
-@router.get("/task/{task_id}")
-def get_task_status(task_id: str):
-    """Get status of a background task."""
-    task = AsyncResult(task_id)
-    
-    # Check if task exists in the queue/is being processed
-    # PENDING can mean either "not started" or "task doesn't exist"
-    # If we have the task_id from our API, it's likely running
-    if task.state == "PENDING":
-        # Check if task is actually in queue
-        from tasks.celery_app import celery_app
-        active = celery_app.control.inspect().active()
-        reserved = celery_app.control.inspect().reserved()
-        
-        # Check if task is in active or reserved
-        is_active = False
-        if active:
-            for worker, tasks in active.items():
-                if any(t['id'] == task_id for t in tasks):
-                    is_active = True
-                    break
-        
-        if not is_active and reserved:
-            for worker, tasks in reserved.items():
-                if any(t['id'] == task_id for t in tasks):
-                    is_active = True
-                    break
-        
-        response = {
+@router.post("/{project_id}/train-and-annotate")
+def start_training_and_annotation(
+    project_id: str,
+    epochs: int = Query(50, ge=1, le=200),
+    batch_size: int = Query(16, ge=1, le=64),
+    confidence_threshold: float = Query(0.25, ge=0.0, le=1.0),
+    db: Session = Depends(get_db)
+):
+    """
+    Train, then auto-annotate with the new model, as one Celery chain.
+    The returned task_id is the chain's last task; training reports its epoch
+    progress under that id too, so its status covers both stages.
+    """
+    project = crud.get_project(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    def start():
+        tracked_id = uuid()
+        return chain(
+            train_model_task.s(project_id, epochs, batch_size, progress_task_id=tracked_id),
+            annotate_after_training_task.s(project_id, epochs, batch_size, confidence_threshold).set(task_id=tracked_id)
+        ).apply_async()
+    
+    task_id, started = _start_once(
+        train_and_annotate_key(project_id, epochs, batch_size, confidence_threshold),
+        project_id,
+        start
+    )
+    
+    return {
+        "message": "Training and auto-annotation started" if started else "Training and auto-annotation already in progress",
+        "task_id": task_id
+    }
+
+
+def _status_response(task_id: str, state: str, info) -> dict:
+    """Build the status response for a task state and its meta."""
+    if state == "PENDING":
+        # With task_track_started, PENDING means queued (or an unknown task_id)
+        return {
             "task_id": task_id,
-            "status": "running" if is_active else "pending",
+            "status": "pending" if task_exists(task_id) else "unknown",
             "progress": 0
         }
-    elif task.state == "PROGRESS" or task.state == "STARTED":
-        response = {
+    elif state == "PROGRESS" or state == "STARTED":
+        return {
             "task_id": task_id,
             "status": "running",
-            "progress": task.info.get("current", 0) if task.info else 0,
-            "total": task.info.get("total", 100) if task.info else 100
+            "progress": info.get("current", 0) if isinstance(info, dict) else 0,
+            "total": info.get("total", 100) if isinstance(info, dict) else 100
         }
-    elif task.state == "SUCCESS":
-        response = {
+    elif state == "SUCCESS":
+        return {
             "task_id": task_id,
             "status": "completed",
             "progress": 100,
-            "result": task.result
+            "result": info
         }
-    elif task.state == "FAILURE":
-        response = {
+    elif state == "FAILURE":
+        return {
             "task_id": task_id,
             "status": "failed",
-            "error": str(task.info)
+            "error": str(info)
         }
     else:
         # Unknown state
-        response = {
+        return {
             "task_id": task_id,
-            "status": task.state.lower(),
-            "info": str(task.info) if task.info else None
+            "status": state.lower(),
+            "info": str(info) if info else None
         }
+
+
+@router.get("/task/{task_id}")
+def get_task_status(task_id: str):
+    """Get status of a background task."""
+    # Finished tasks never change; answer repeat polls from memory
+    cached = _finished_tasks.get(task_id)
+    if cached:
+        return Response(content=cached, media_type="application/json")
+    
+    # One backend round-trip (AsyncResult.state/.info would each re-fetch).
+    # Use the configured app's backend: sync handlers run in a threadpool,
+    # where celery's thread-local "current app" is the unconfigured default.
+    meta = celery_app.backend.get_task_meta(task_id)
+    state = meta["status"]
+    response = _status_response(task_id, state, meta.get("result"))
+    
+    if state in states.READY_STATES:
+        body = orjson.dumps(response)
+        _finished_tasks[task_id] = body
+        if len(_finished_tasks) > FINISHED_TASK_CACHE_SIZE:
+            _finished_tasks.popitem(last=False)
+        return Response(content=body, media_type="application/json")
     
     return response
 
 
+def _sse_event(response: dict) -> bytes:
+    return b"data: " + orjson.dumps(response) + b"\n\n"
+
+
+@router.get("/task/{task_id}/stream")
+async def stream_task_status(task_id: str, request: Request):
+    """
+    Stream task status as Server-Sent Events until the task finishes.
+    The Celery Redis backend publishes every stored state (STARTED,
+    update_state progress, SUCCESS/FAILURE) on the task's meta key,
+    so subscribing to it pushes updates without polling.
+    """
+    channel = celery_app.backend.get_key_for_task(task_id)
+    
+    async def events():
+        pubsub = async_redis_client.pubsub()
+        # Subscribe before reading the current state so no update is missed
+        await pubsub.subscribe(channel)
+        try:
+            meta = await run_in_threadpool(celery_app.backend.get_task_meta, task_id)
+            state = meta["status"]
+            response = await run_in_threadpool(_status_response, task_id, state, meta.get("result"))
+            yield _sse_event(response)
+            
+            while state not in states.READY_STATES and response["status"] != "unknown":
+                if await request.is_disconnected():
+                    break
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=STREAM_KEEPALIVE)
+                if message is None:
+                    yield b": keep-alive\n\n"
+                    continue
+                meta = celery_app.backend.decode_result(message["data"])
+                state = meta["status"]
+                response = _status_response(task_id, state, meta.get("result"))
+                yield _sse_event(response)
+        finally:
+            await pubsub.reset()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.delete("/task/{task_id}")
 def cancel_task(task_id: str):
     """Cancel a running task."""
-    from tasks.celery_app import celery_app
-    
     # Revoke the task
     celery_app.control.revoke(task_id, terminate=True, signal='SIGTERM')
     
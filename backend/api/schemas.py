@@ -1,8 +1,9 @@
 """
 Pydantic schemas for API request/response validation.
 """
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Annotated, List, Optional
+from typing_extensions import NotRequired, TypedDict
 from datetime import datetime
 
 
@@ -65,12 +66,16 @@ class ImageResponse(BaseModel):
 
 # ================== Annotation Schemas ==================
 
+# Normalized coordinate; shared by BBox and BBoxDict so their rules can't drift
+UnitFloat = Annotated[float, Field(ge=0, le=1)]
+
+
 class BBox(BaseModel):
     """Bounding box in YOLO format (normalized)."""
-    x: float = Field(..., ge=0, le=1)  # Center X
-    y: float = Field(..., ge=0, le=1)  # Center Y
-    w: float = Field(..., ge=0, le=1)  # Width
-    h: float = Field(..., ge=0, le=1)  # Height
+    x: UnitFloat  # Center X
+    y: UnitFloat  # Center Y
+    w: UnitFloat  # Width
+    h: UnitFloat  # Height
 
 
 class AnnotationCreate(BaseModel):
@@ -82,9 +87,31 @@ class AnnotationCreate(BaseModel):
     source: str = "manual"
 
 
+# Plain-dict twins of BBox/AnnotationCreate for bulk endpoints: validating
+# into TypedDicts yields dicts directly, without building model instances.
+class BBoxDict(TypedDict):
+    """Bounding box in YOLO format (normalized), as a plain dict."""
+    x: UnitFloat
+    y: UnitFloat
+    w: UnitFloat
+    h: UnitFloat
+
+
+class AnnotationCreateDict(TypedDict):
+    """Annotation create payload, as a plain dict (same rules as AnnotationCreate)."""
+    image_id: str
+    class_id: int
+    bbox: BBoxDict
+    confidence: NotRequired[Optional[float]]
+    source: NotRequired[str]
+
+
+AnnotationBatchAdapter = TypeAdapter(List[AnnotationCreateDict])
+
+
 class AnnotationResponse(BaseModel):
     """Schema for annotation response."""
-    id: str
+    id: int
     image_id: str
     class_id: int
     bbox: dict
@@ -0,0 +1,90 @@
+"""
+Static file serving for the frontend SPA.
+Files are read, hashed and gzipped once at startup and served from memory.
+"""
+import gzip
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+
+# Text-like types worth compressing (images/fonts are already compressed)
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_SIZE = 1024
+
+
+class CachedFile(NamedTuple):
+    """One precomputed static asset."""
+    body: bytes
+    gzip_body: Optional[bytes]
+    etag: str
+    content_type: str
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves from an in-memory cache built at startup.
+    Adds ETag / If-None-Match handling and serves gzipped variants
+    when the client accepts them. Unknown paths fall back to StaticFiles.
+    """
+
+    def __init__(self, *, directory: str, max_age: int = 0, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.cache_control = f"public, max-age={max_age}, must-revalidate"
+        self.files = self._build_cache(Path(directory))
+        print(f"Cached {len(self.files)} static files from {directory}")
+
+    def _build_cache(self, root: Path) -> Dict[str, CachedFile]:
+        """Read every file under root and precompute its headers and gzip body."""
+        files = {}
+        for path in root.rglob("*"):
+            if not path.is_file() or path.suffix == ".gz":
+                continue
+
+            body = path.read_bytes()
+            content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+            # Prefer a precompressed sibling generated at build time
+            gzip_body = None
+            gz_sibling = path.with_name(path.name + ".gz")
+            if gz_sibling.exists():
+                gzip_body = gz_sibling.read_bytes()
+            elif content_type.startswith(COMPRESSIBLE_TYPES) and len(body) >= MIN_COMPRESS_SIZE:
+                gzip_body = gzip.compress(body, compresslevel=9)
+
+            files[path.relative_to(root).as_posix()] = CachedFile(
+                body=body,
+                gzip_body=gzip_body,
+                etag=f'"{hashlib.md5(body).hexdigest()}"',
+                content_type=content_type
+            )
+        return files
+
+    async def get_response(self, path: str, scope) -> Response:
+        entry = self.files.get(path.replace("\\", "/"))
+        if entry is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+
+        request_headers = Headers(scope=scope)
+        headers = {
+            "ETag": entry.etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+
+        if request_headers.get("if-none-match") == entry.etag:
+            return Response(status_code=304, headers=headers)
+
+        body = entry.body
+        if entry.gzip_body is not None and "gzip" in request_headers.get("accept-encoding", ""):
+            body = entry.gzip_body
+            headers["Content-Encoding"] = "gzip"
+
+        if scope["method"] == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            return Response(status_code=200, headers=headers, media_type=entry.content_type)
+        return Response(content=body, headers=headers, media_type=entry.content_type)
@@ -3,7 +3,7 @@ Configuration settings for the application.
 Loads from environment variables.
 """
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -14,6 +14,16 @@ class Settings(BaseSettings):
     DB_HOST: str = "postgres"  # Docker service name
     DB_PORT: int = 5432
     
+    # Database connection pool
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 30
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Recycle connections after 30 minutes
+    # SELECT 1 on every checkout; safe to turn off for a local/reliable DB
+    # (pool_recycle already retires connections before server timeouts)
+    DB_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 60000  # Postgres statement_timeout; 0 disables
+    
     # Redis
     REDIS_URL: str = "redis://redis:6379/0"  # Docker service name
     
@@ -25,13 +35,61 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "change-this-in-production"
     DEBUG: bool = True
     
+    # CORS (explicit lists; set as JSON arrays in the environment)
+    CORS_ORIGINS: List[str] = ["http://localhost:8000", "http://127.0.0.1:8000"]
+    CORS_METHODS: List[str] = ["GET", "POST", "PUT", "DELETE", "OPTIONS"]
+    CORS_HEADERS: List[str] = ["Content-Type", "Authorization"]
+    CORS_MAX_AGE: int = 86400  # Let browsers cache preflight responses for a day
+    
+    # API server
+    WEB_CONCURRENCY: Optional[int] = None  # Uvicorn workers; defaults to 2 (see api.main)
+    THREADPOOL_SIZE: int = 100  # AnyIO worker threads for sync handlers/threadpool calls
+    
     # Paths
     DATA_DIR: str = "/data"
     MODELS_DIR: str = "/models"
     
+    # Uploads: run PIL verify() over the whole file, not just magic bytes + header
+    STRICT_IMAGE_VALIDATION: bool = False
+    
+    # Static frontend caching (assets aren't content-hashed, so revalidate via ETag by default)
+    STATIC_MAX_AGE: int = 0
+    
     # Model Settings
     DEFAULT_EMBEDDING_MODEL: str = "clip"
     DEFAULT_DETECTION_MODEL: str = "yolov8n.pt"
+    # Load the CLIP model when each Celery worker process starts, not on its first task
+    PRELOAD_EMBEDDING_MODEL: bool = False
+    # Cache preprocessed CLIP pixel tensors under DATA_DIR/preproc (keyed by file content)
+    PREPROC_CACHE_ENABLED: bool = True
+    PREPROC_CACHE_MAX_MB: int = 4096  # Least recently used entries evicted past this (0 = unbounded)
+    # Reuse embeddings of unchanged images under DATA_DIR/embcache (keyed by file content and model)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_MB: int = 1024  # Least recently used entries evicted past this (0 = unbounded)
+    # Images per CLIP forward; unset sizes batches from free GPU memory (32 on CPU)
+    EMBEDDING_BATCH_SIZE: Optional[int] = None
+    # Threads reading/hashing/decoding images for the embedder; unset uses min(8, CPUs)
+    EMBEDDING_LOADER_WORKERS: Optional[int] = None
+    # Auto-annotation: split projects with more images into chord shards of this size (0 = off)
+    AUTO_ANNOTATE_SHARD_SIZE: int = 0
+    # torch.compile the auto-annotation YOLO network (run channels-last) and the
+    # CLIP image tower (CUDA only)
+    ENABLE_TORCH_COMPILE: bool = False
+    
+    # Vector index: "hnsw" (approximate, sub-linear search), "flat" (exact), "ivfpq"
+    # (compressed, trained) or "auto" (picked by project size at the first save)
+    FAISS_INDEX_TYPE: str = "hnsw"
+    FAISS_HNSW_M: int = 32  # Graph neighbours per node
+    FAISS_HNSW_EF_CONSTRUCTION: int = 200
+    FAISS_HNSW_EF_SEARCH: int = 64
+    FAISS_IVFPQ_M: int = 32  # PQ sub-quantizers (bytes per vector at 8 bits)
+    FAISS_IVF_NPROBE: int = 16  # Inverted lists scanned per query
+    # "auto": flat below the first size, ivfpq below the second, hnsw above
+    FAISS_AUTO_FLAT_MAX: int = 10_000
+    FAISS_AUTO_IVFPQ_MAX: int = 1_000_000
+    # Vector storage precision in the index and vectors file: "fp16", "int8" (trained,
+    # index only; the vectors file stays fp16) or "fp32"
+    FAISS_VECTOR_DTYPE: str = "fp16"
     
     @property
     def DATABASE_URL(self) -> str:
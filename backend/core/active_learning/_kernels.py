@@ -0,0 +1,44 @@
+"""
+Numba kernels for active learning selection.
+Optional: HAS_NUMBA is False when numba isn't installed and the
+selector keeps its numpy implementation.
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+if HAS_NUMBA:
+
+    # fastmath minus "ninf"/"nnan": the -inf sentinel for picked points must compare exactly
+    @njit(parallel=True, fastmath={"nsz", "arcp", "contract", "afn", "reassoc"}, cache=True)
+    def farthest_point_sampling(embeddings: np.ndarray, min_dist: np.ndarray, k: int) -> np.ndarray:
+        """
+        Greedy farthest-point sampling on unit-norm embeddings.
+        min_dist holds each sample's current distance to the selected set
+        and is updated in place. Returns indices of the k samples picked.
+        """
+        n, d = embeddings.shape
+        selected = np.empty(k, dtype=np.int64)
+        for s in range(k):
+            best_idx = np.argmax(min_dist)
+            selected[s] = best_idx
+            min_dist[best_idx] = -np.inf
+
+            # Treat the picked sample as annotated for the next iteration:
+            # distance and running minimum fused in one pass, no temporaries
+            for i in prange(n):
+                if min_dist[i] == -np.inf:
+                    continue
+                dot = 0.0
+                for t in range(d):
+                    dot += embeddings[i, t] * embeddings[best_idx, t]
+                dist = 1.0 - dot
+                if dist < min_dist[i]:
+                    min_dist[i] = dist
+
+        return selected
@@ -2,15 +2,29 @@
 Active learning module.
 Intelligently selects images for annotation based on embeddings.
 """
+import threading
 import numpy as np
 from typing import List, Set
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
+from ._kernels import HAS_NUMBA
+
+if HAS_NUMBA:
+    from ._kernels import farthest_point_sampling
+
+# Routes call the selector from several threadpool threads, and numba's
+# fallback "workqueue" threading layer (no TBB/OpenMP) aborts the process
+# on concurrent parallel kernel calls
+_kernel_lock = threading.Lock()
 
 
 class ActiveLearningSelector:
     """
     Active learning selector using diversity sampling.
     Selects images that are most different from already annotated ones.
+    
+    Embeddings are expected to be L2-normalized (as EmbeddingGenerator
+    produces), so distances are computed as cosine distance 1 - <a, b>
+    with matrix products instead of pairwise norms.
     """
     
     def __init__(self):
@@ -103,20 +117,23 @@ class ActiveLearningSelector:
         K-means clustering and select samples closest to cluster centers.
         Good for initial batch when nothing is annotated yet.
         """
-        # Run k-means
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+        # Run k-means (mini-batch with a single init is plenty for seeding a batch)
+        kmeans = MiniBatchKMeans(n_clusters=k, random_state=42, n_init=1, batch_size=1024)
         kmeans.fit(embeddings)
         
         # Find samples closest to each cluster center
+        # For unit-norm embeddings, the largest <e, center> is the nearest in L2
+        similarities = embeddings @ kmeans.cluster_centers_.T
+        nearest = similarities.argmax(axis=0)
+        taken = np.zeros(len(embeddings), dtype=bool)
+        
         selected_indices = []
-        for center in kmeans.cluster_centers_:
-            # Compute distances to this center
-            distances = np.linalg.norm(embeddings - center, axis=1)
-            # Find closest sample not already selected
-            for idx in np.argsort(distances):
-                if idx not in selected_indices:
-                    selected_indices.append(idx)
-                    break
+        for c, idx in enumerate(nearest):
+            if taken[idx]:
+                # Nearest already picked by another center: next closest free sample
+                idx = np.argmax(np.where(taken, -np.inf, similarities[:, c]))
+            taken[idx] = True
+            selected_indices.append(int(idx))
         
         return [image_ids[i] for i in selected_indices]
     
@@ -130,42 +147,35 @@ class ActiveLearningSelector:
         """
         Select samples that are farthest from annotated set.
         Maximizes diversity by choosing dissimilar examples.
+        
+        Greedy farthest-point sampling: distances to the annotated set are
+        computed once, then each pick only updates the running minimum
+        with distances to the newly selected point.
+        The selection loop runs as a fused numba kernel when numba is installed;
+        the initial distance matrix stays a BLAS matrix product.
         """
-        selected_indices = []
+        k = min(k, len(unannotated_ids))
         
-        for _ in range(k):
-            if len(selected_indices) == len(unannotated_ids):
-                break
-            
-            # For each unannotated sample, compute min distance to annotated set
-            max_min_dist = -1
-            best_idx = None
-            
-            for i in range(len(unannotated_embeddings)):
-                if i in selected_indices:
-                    continue
-                
-                # Distance to all annotated samples
-                distances = np.linalg.norm(
-                    annotated_embeddings - unannotated_embeddings[i], 
-                    axis=1
+        # Minimum cosine distance from each unannotated sample to annotated set
+        min_dist = 1.0 - (unannotated_embeddings @ annotated_embeddings.T).max(axis=1)
+        
+        if HAS_NUMBA:
+            with _kernel_lock:
+                selected_indices = farthest_point_sampling(
+                    np.ascontiguousarray(unannotated_embeddings, dtype=np.float32),
+                    min_dist.astype(np.float32),
+                    k
                 )
-                
-                # Minimum distance to annotated set
-                min_dist = np.min(distances)
-                
-                # Keep track of sample with maximum minimum distance
-                if min_dist > max_min_dist:
-                    max_min_dist = min_dist
-                    best_idx = i
+            return [unannotated_ids[i] for i in selected_indices]
+        
+        selected_indices = []
+        for _ in range(k):
+            best_idx = int(np.argmax(min_dist))
+            selected_indices.append(best_idx)
             
-            if best_idx is not None:
-                selected_indices.append(best_idx)
-                
-                # Add this to annotated set for next iteration
-                annotated_embeddings = np.vstack([
-                    annotated_embeddings, 
-                    unannotated_embeddings[best_idx:best_idx+1]
-                ])
+            # Treat the picked sample as annotated for the next iteration
+            new_dist = 1.0 - unannotated_embeddings @ unannotated_embeddings[best_idx]
+            min_dist = np.minimum(min_dist, new_dist)
+            min_dist[best_idx] = -np.inf
         
         return [unannotated_ids[i] for i in selected_indices]
@@ -2,9 +2,62 @@
 Auto-annotator module.
 Runs inference to automatically annotate images.
 """
+import numpy as np
+import torch
 from ultralytics import YOLO
-from typing import List, Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
+from functools import lru_cache
+import logging
+import os
+from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def _compile_for_inference(model: YOLO):
+    """
+    Switch the detection network to channels-last and torch.compile its
+    forward (opt-in, CUDA only; see settings.ENABLE_TORCH_COMPILE).
+    forward is compiled in place rather than wrapping the module, so
+    ultralytics still sees a plain DetectionModel (fuse(), names, stride).
+    Compilation happens on the first batch; if it fails there, the model
+    falls back to eager for good.
+    """
+    if not (settings.ENABLE_TORCH_COMPILE and torch.cuda.is_available()):
+        return
+    
+    network = model.model
+    network.to(memory_format=torch.channels_last)
+    eager_forward = network.forward
+    try:
+        # dynamic=True: letterboxed batch shapes vary between images/batches
+        compiled_forward = torch.compile(eager_forward, dynamic=True)
+    except Exception as e:
+        logger.warning("torch.compile unavailable, running eager: %s", e)
+        return
+    
+    def forward(*args, **kwargs):
+        try:
+            return compiled_forward(*args, **kwargs)
+        except Exception as e:
+            logger.warning("Compiled forward failed, falling back to eager: %s", e)
+            network.forward = eager_forward
+            return eager_forward(*args, **kwargs)
+    
+    network.forward = forward
+    logger.info("Detection model compiled (channels-last)")
+
+
+@lru_cache(maxsize=4)
+def _load_model(model_path: str, mtime: Optional[float]) -> YOLO:
+    """Load YOLO weights once per (path, file version) in this process."""
+    logger.info("Loading model from %s", model_path)
+    model = YOLO(model_path)
+    _compile_for_inference(model)
+    logger.info("Model loaded")
+    return model
 
 
 class AutoAnnotator:
@@ -13,10 +66,16 @@ class AutoAnnotator:
     """
     
     def __init__(self, model_path: str):
-        """Load trained model."""
-        print(f"Loading model from {model_path}...")
-        self.model = YOLO(model_path)
-        print(f"Model loaded!")
+        """
+        Load trained model.
+        Reuses weights already loaded in this process; keyed on the file's
+        mtime too, since retraining overwrites best.pt in place.
+        """
+        try:
+            mtime = os.path.getmtime(model_path)
+        except OSError:
+            mtime = None  # e.g. a hub model name, resolved by ultralytics
+        self.model = _load_model(model_path, mtime)
     
     def annotate_image(
         self, 
@@ -41,62 +100,103 @@ class AutoAnnotator:
             verbose=False
         )
         
-        annotations = []
-        
-        # Process results
-        result = results[0]  # First (and only) result
+        return self._result_to_annotations(results[0])  # First (and only) result
+    
+    def _result_to_arrays(self, result) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Pull one YOLO result's detections off the device as arrays:
+        (xywhn (N x 4), class ids (N,), confidences (N,)).
+        Boxes are normalized center x, y, width, height (YOLO format),
+        relative to the original image.
+        """
         boxes = result.boxes
+        if len(boxes) == 0:
+            return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return boxes.xywhn.cpu().numpy(), boxes.cls.cpu().numpy().astype(np.int64), boxes.conf.cpu().numpy()
+    
+    def _result_to_annotations(self, result) -> List[Dict]:
+        """Convert one YOLO result into annotation dicts (vectorized per image)."""
+        xywhn, class_ids, confidences = self._result_to_arrays(result)
         
-        for box in boxes:
-            # Get box in xyxy format
-            xyxy = box.xyxy[0].cpu().numpy()
-            
-            # Convert to YOLO format (normalized center x, y, width, height)
-            img_width = result.orig_shape[1]
-            img_height = result.orig_shape[0]
-            
-            x_center = ((xyxy[0] + xyxy[2]) / 2) / img_width
-            y_center = ((xyxy[1] + xyxy[3]) / 2) / img_height
-            width = (xyxy[2] - xyxy[0]) / img_width
-            height = (xyxy[3] - xyxy[1]) / img_height
+        return [
+            {
+                "class_id": cls_id,
+                "bbox": {"x": x, "y": y, "w": w, "h": h},
+                "confidence": conf
+            }
+            for (x, y, w, h), cls_id, conf in zip(xywhn.tolist(), class_ids.tolist(), confidences.tolist())
+        ]
+    
+    def _predict_stream(self, image_paths: List[str], confidence_threshold: float, iou_threshold: float, batch_size: int):
+        """
+        One predict call per batch_size slice of image_paths: a list source
+        is decoded up front and run as a single batch, so slicing is what
+        bounds memory. Yields (image_path, result) in image_paths order.
+        """
+        for start in range(0, len(image_paths), batch_size):
+            batch_paths = image_paths[start:start + batch_size]
+            results = self.model.predict(
+                source=batch_paths,
+                conf=confidence_threshold,
+                iou=iou_threshold,
+                verbose=False,
+                stream=True
+            )
             
-            annotations.append({
-                "class_id": int(box.cls[0]),
-                "bbox": {
-                    "x": float(x_center),
-                    "y": float(y_center),
-                    "w": float(width),
-                    "h": float(height)
-                },
-                "confidence": float(box.conf[0])
-            })
+            yield from zip(batch_paths, results)
+            logger.debug("Processed %d/%d images", start + len(batch_paths), len(image_paths))
+    
+    def iter_annotations(
+        self,
+        image_paths: List[str],
+        confidence_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        batch_size: int = 16
+    ) -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        Annotate multiple images, yielding (image_path, annotations) in
+        image_paths order as soon as each result is ready.
+        """
+        if not image_paths:
+            return
         
-        return annotations
+        for image_path, result in self._predict_stream(image_paths, confidence_threshold, iou_threshold, batch_size):
+            yield image_path, self._result_to_annotations(result)
+    
+    def iter_detections(
+        self,
+        image_paths: List[str],
+        confidence_threshold: float = 0.25,
+        iou_threshold: float = 0.45,
+        batch_size: int = 16
+    ) -> Iterator[Tuple[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]]:
+        """
+        Like iter_annotations, but yields (image_path, (xywhn, class_ids,
+        confidences)) arrays instead of per-box dicts, for callers that
+        process detections in bulk.
+        """
+        if not image_paths:
+            return
+        
+        for image_path, result in self._predict_stream(image_paths, confidence_threshold, iou_threshold, batch_size):
+            yield image_path, self._result_to_arrays(result)
     
     def annotate_batch(
         self,
         image_paths: List[str],
         confidence_threshold: float = 0.25,
-        iou_threshold: float = 0.45
+        iou_threshold: float = 0.45,
+        batch_size: int = 16
     ) -> Dict[str, List[Dict]]:
         """
         Annotate multiple images.
         Returns: dict mapping image_path to list of annotations
         """
-        print(f"Auto-annotating {len(image_paths)} images...")
-        
-        all_annotations = {}
+        logger.info("Auto-annotating %d images", len(image_paths))
         
-        for i, image_path in enumerate(image_paths):
-            annotations = self.annotate_image(
-                image_path, 
-                confidence_threshold, 
-                iou_threshold
-            )
-            all_annotations[image_path] = annotations
-            
-            if (i + 1) % 10 == 0:
-                print(f"   Processed {i + 1}/{len(image_paths)} images")
+        all_annotations = dict(self.iter_annotations(
+            image_paths, confidence_threshold, iou_threshold, batch_size
+        ))
         
-        print(f"Auto-annotation completed!")
+        logger.info("Auto-annotation completed")
         return all_annotations
@@ -2,14 +2,37 @@
 Dataset processor module.
 Handles image upload, validation, and storage.
 """
+import errno
 import os
 import shutil
+import uuid
 from pathlib import Path
 from PIL import Image
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from config import settings
 
 
+# Magic-byte prefixes of the accepted upload formats
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"BM", "BMP"),
+    (b"II*\x00", "TIFF"),
+    (b"MM\x00*", "TIFF"),
+)
+SIGNATURE_BYTES = 16
+
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    """Identify an accepted image format from its first bytes (None if not one)."""
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "WEBP"
+    for prefix, fmt in IMAGE_SIGNATURES:
+        if header.startswith(prefix):
+            return fmt
+    return None
+
+
 class DatasetProcessor:
     """Simple dataset processor - validate and save images."""
     
@@ -21,38 +44,91 @@ class DatasetProcessor:
         # Create directories
         self.images_dir.mkdir(parents=True, exist_ok=True)
     
-    def validate_image(self, file_path: str) -> Tuple[bool, str]:
+    def validate_image(self, file_path: str, strict: bool = None) -> Tuple[bool, str]:
         """
         Validate if file is a valid image.
         Returns: (is_valid, error_message)
         """
-        try:
-            with Image.open(file_path) as img:
-                # Check if it's a valid image
-                img.verify()
-                return True, ""
-        except Exception as e:
-            return False, str(e)
+        is_valid, error, _, _ = self.inspect_image(file_path, strict=strict)
+        return is_valid, error
     
     def get_image_dimensions(self, file_path: str) -> Tuple[int, int]:
         """Get image width and height."""
         with Image.open(file_path) as img:
             return img.size  # Returns (width, height)
     
-    def save_image(self, source_path: str, filename: str) -> str:
+    def inspect_image(self, file_path: str, strict: bool = None) -> Tuple[bool, str, int, int]:
+        """
+        Validate an image and read its dimensions with a single open.
+        By default only the magic bytes and the header are checked (Image.open
+        parses the header lazily, and enforces MAX_IMAGE_PIXELS); strict=True
+        also runs verify(), which walks the whole file.
+        Returns: (is_valid, error_message, width, height)
+        """
+        if strict is None:
+            strict = settings.STRICT_IMAGE_VALIDATION
+        try:
+            with open(file_path, "rb") as f:
+                if sniff_image_format(f.read(SIGNATURE_BYTES)) is None:
+                    return False, "Unsupported image format (expected JPEG, PNG, WebP, BMP or TIFF)", 0, 0
+                f.seek(0)
+                with Image.open(f) as img:
+                    # Size comes from the header; read it before verify() invalidates img
+                    width, height = img.size
+                    if strict:
+                        img.verify()
+                    return True, "", width, height
+        except Exception as e:
+            return False, str(e), 0, 0
+    
+    def save_image(self, source_path: str, filename: str, move: bool = False) -> str:
         """
         Save image to project directory.
+        If move is True the source is renamed into place instead of copied;
+        across filesystems it falls back to copy + delete.
         Returns: path to saved image
         """
         # Clean filename
         clean_filename = self._clean_filename(filename)
         dest_path = self.images_dir / clean_filename
         
-        # Copy file
-        shutil.copy2(source_path, dest_path)
+        if move:
+            try:
+                os.replace(source_path, dest_path)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                # Different filesystem: rename isn't possible
+                self._copy_file(source_path, dest_path)
+                os.remove(source_path)
+        else:
+            # Copy file
+            self._copy_file(source_path, dest_path)
         
         return str(dest_path)
     
+    def _copy_file(self, source_path: str, dest_path: Path):
+        """Copy file contents kernel-side with sendfile where available."""
+        if not hasattr(os, "sendfile"):
+            shutil.copyfile(source_path, dest_path)
+            return
+        with open(source_path, "rb") as src, open(dest_path, "wb") as dst:
+            size = os.fstat(src.fileno()).st_size
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+    
+    def get_staging_path(self) -> str:
+        """
+        Get a unique path inside the images directory to stream an upload into.
+        Staging next to the final location lets process_uploaded_file(move=True)
+        rename it into place instead of copying.
+        """
+        return str(self.images_dir / f".upload-{uuid.uuid4().hex}.part")
+    
     def _clean_filename(self, filename: str) -> str:
         """Clean filename to avoid issues."""
         # Remove any path components
@@ -61,21 +137,19 @@ class DatasetProcessor:
         filename = filename.replace(" ", "_")
         return filename
     
-    def process_uploaded_file(self, file_path: str, original_filename: str) -> dict:
+    def process_uploaded_file(self, file_path: str, original_filename: str, move: bool = False) -> dict:
         """
         Process an uploaded file: validate, get dimensions, save.
+        With move=True, file_path is renamed into place (see get_staging_path).
         Returns: dict with file info or error
         """
-        # Validate
-        is_valid, error = self.validate_image(file_path)
+        # Validate and get dimensions
+        is_valid, error, width, height = self.inspect_image(file_path)
         if not is_valid:
             return {"success": False, "error": f"Invalid image: {error}"}
         
-        # Get dimensions
-        width, height = self.get_image_dimensions(file_path)
-        
         # Save
-        saved_path = self.save_image(file_path, original_filename)
+        saved_path = self.save_image(file_path, original_filename, move=move)
         
         return {
             "success": True,
@@ -1,4 +1,4 @@
 """Embedding generator package."""
-from .generator import EmbeddingGenerator, FAISSVectorStore
+from .generator import EmbeddingGenerator, FAISSVectorStore, get_vector_store, vector_index_path
 
-__all__ = ["EmbeddingGenerator", "FAISSVectorStore"]
+__all__ = ["EmbeddingGenerator", "FAISSVectorStore", "get_vector_store", "vector_index_path"]
@@ -2,16 +2,127 @@
 Embedding generator module.
 Extracts feature embeddings from images using pretrained models.
 """
+import hashlib
+import io
+import logging
+import os
+import tempfile
 import torch
 import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from PIL import Image
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Tuple
+from functools import lru_cache
 import faiss
 from transformers import CLIPProcessor, CLIPModel
 from config import settings
 
 
+logger = logging.getLogger(__name__)
+
+LOAD_CHUNK_SIZE = 32  # Images decoded/preprocessed per loader task
+DEFAULT_BATCH_SIZE = 32  # Images per forward on CPU
+MIN_BATCH_SIZE = 8
+MAX_BATCH_SIZE = 256
+GPU_BYTES_PER_IMAGE = 16 * 1024 * 1024  # Conservative fp16 ViT-B forward footprint
+
+
+def prune_cache(cache_root: Path, max_bytes: int) -> int:
+    """
+    Evict least recently used files under cache_root (by mtime; cache hits
+    touch their file) until it is back under 90% of max_bytes.
+    Returns: number of files removed
+    """
+    entries = []  # (mtime, size, path)
+    total = 0
+    for dirpath, _, filenames in os.walk(cache_root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Removed by a concurrent prune
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    if total <= max_bytes:
+        return 0
+    
+    removed = 0
+    target = max_bytes * 0.9  # Headroom, so the next run doesn't prune again right away
+    for _, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def _touch(path: Path):
+    """Mark a cache entry as recently used for prune_cache."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+@lru_cache(maxsize=2)
+def _load_clip(model_name: str, device: str, dtype: torch.dtype):
+    """
+    Load a CLIP model and processor once per process.
+    Returns: (model, processor, image feature function)
+    """
+    logger.info("Loading %s on %s (%s)", model_name, device, dtype)
+    
+    # Load CLIP model
+    model = CLIPModel.from_pretrained(model_name, torch_dtype=dtype).to(device)
+    processor = CLIPProcessor.from_pretrained(model_name)
+    model.eval()  # Set to evaluation mode
+    
+    return model, processor, _compile_image_features(model.get_image_features, device)
+
+
+def _compile_image_features(eager_features, device: str):
+    """
+    torch.compile the image tower (opt-in, CUDA only; see
+    settings.ENABLE_TORCH_COMPILE). The method is compiled rather than the
+    module, which would only cover forward(), never called here.
+    Compilation happens on the first batch; if it fails there, embedding
+    falls back to eager for good. CUDA OOM is re-raised for _embed_adaptive.
+    """
+    if not (settings.ENABLE_TORCH_COMPILE and device == "cuda"):
+        return eager_features
+    
+    try:
+        # dynamic=True: batch sizes vary (VRAM sizing, OOM halving, cache misses)
+        compiled_features = torch.compile(eager_features, dynamic=True)
+    except Exception as e:
+        logger.warning("torch.compile unavailable, running eager: %s", e)
+        return eager_features
+    
+    current = [compiled_features]
+    
+    def image_features(*args, **kwargs):
+        try:
+            return current[0](*args, **kwargs)
+        except torch.cuda.OutOfMemoryError:
+            raise
+        except Exception as e:
+            if current[0] is eager_features:
+                raise
+            logger.warning("Compiled image tower failed, falling back to eager: %s", e)
+            current[0] = eager_features
+            return eager_features(*args, **kwargs)
+    
+    return image_features
+
+
 class EmbeddingGenerator:
     """Generate embeddings using CLIP model (simple and effective)."""
     
@@ -21,16 +132,31 @@ class EmbeddingGenerator:
         Using CLIP by default - works great for general images.
         """
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Loading {model_name} on {self.device}...")
+        # Half precision on GPU halves memory traffic and uses tensor cores
+        self.dtype = torch.float16 if self.device == "cuda" else torch.float32
         
-        # Load CLIP model
-        self.model = CLIPModel.from_pretrained(model_name).to(self.device)
-        self.processor = CLIPProcessor.from_pretrained(model_name)
-        self.model.eval()  # Set to evaluation mode
+        # Weights are loaded once per process and shared by every generator
+        self.model, self.processor, self._image_features = _load_clip(model_name, self.device, self.dtype)
         
         self.embedding_dim = 512  # CLIP ViT-Base outputs 512-dim vectors
+        self._max_forward = None  # Largest forward batch known to fit (set after an OOM)
         
-        print(f"Model loaded! Embedding dimension: {self.embedding_dim}")
+        # Preprocessed pixels depend only on file bytes and processor config,
+        # so key the cache directory by the config (shared across model swaps)
+        self.preproc_dir = None
+        if settings.PREPROC_CACHE_ENABLED:
+            config_hash = hashlib.sha1(self.processor.image_processor.to_json_string().encode()).hexdigest()[:12]
+            self.preproc_dir = Path(settings.DATA_DIR) / "preproc" / config_hash
+            self.preproc_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Embeddings depend on file bytes and the model, so key this one by model name
+        self.embedding_cache_dir = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            model_hash = hashlib.sha1(model_name.encode()).hexdigest()[:12]
+            self.embedding_cache_dir = Path(settings.DATA_DIR) / "embcache" / model_hash
+            self.embedding_cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        logger.info("Model loaded, embedding dimension %d", self.embedding_dim)
     
     def generate_embedding(self, image_path: str) -> np.ndarray:
         """
@@ -42,62 +168,262 @@ class EmbeddingGenerator:
         
         # Process image
         inputs = self.processor(images=image, return_tensors="pt")
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
         
-        # Generate embedding
-        with torch.no_grad():
-            outputs = self.model.get_image_features(**inputs)
-            embedding = outputs.cpu().numpy()[0]
+        return self._embed(inputs["pixel_values"])[0]
+    
+    def _embed(self, pixel_values: torch.Tensor) -> np.ndarray:
+        """
+        Run the image tower on preprocessed pixels.
+        Returns: L2-normalized float32 numpy array of shape (batch, embedding_dim)
+        """
+        pixel_values = pixel_values.to(self.device, dtype=self.dtype, non_blocking=True)
         
-        # Normalize (good practice for similarity search)
-        embedding = embedding / np.linalg.norm(embedding)
+        with torch.inference_mode():
+            outputs = self._image_features(pixel_values=pixel_values)
+            # Normalize on device (good practice for similarity search)
+            outputs = torch.nn.functional.normalize(outputs.float(), dim=-1)
         
-        return embedding
+        return outputs.cpu().numpy()
     
-    def generate_batch_embeddings(self, image_paths: List[str], batch_size: int = 32) -> np.ndarray:
+    def _load_batch(self, image_paths: List[str]) -> Tuple[List[Optional[np.ndarray]], Optional[torch.Tensor], list]:
+        """
+        Decode and preprocess a batch of images into pixel_values (CPU).
+        With the embedding cache enabled, images whose content was embedded
+        before by this model are skipped entirely; with the preproc cache,
+        the rest are loaded from disk instead of decoded and preprocessed again.
+        Returns: (embeddings, pixel_values, misses)
+            embeddings: cached embedding or None, per image
+            pixel_values: preprocessed pixels of the misses (None if no misses)
+            misses: (batch index, embedding cache path or None) per miss, in pixel_values order
+        """
+        embeddings = [None] * len(image_paths)
+        if self.preproc_dir is None and self.embedding_cache_dir is None:
+            images = [Image.open(path).convert("RGB") for path in image_paths]
+            pixel_values = self.processor(images=images, return_tensors="pt", padding=True)["pixel_values"]
+            misses = [(i, None) for i in range(len(image_paths))]
+        else:
+            items = []  # (index, file bytes, digest)
+            misses = []
+            for i, path in enumerate(image_paths):
+                # Read once: hash the bytes (both caches key on it), decode the same bytes on a miss
+                with open(path, "rb") as f:
+                    data = f.read()
+                digest = hashlib.sha1(data).hexdigest()
+                cache_path = None
+                if self.embedding_cache_dir is not None:
+                    cache_path = self.embedding_cache_dir / digest[:2] / f"{digest}.npy"
+                    try:
+                        embeddings[i] = np.load(cache_path)
+                        _touch(cache_path)
+                        continue
+                    except (OSError, ValueError):
+                        pass
+                items.append((i, data, digest))
+                misses.append((i, cache_path))
+            pixel_values = self._preprocess(items) if items else None
+        if pixel_values is not None and self.device == "cuda":
+            pixel_values = pixel_values.pin_memory()  # Enables async host->device copy
+        return embeddings, pixel_values, misses
+    
+    def _preprocess(self, items: list) -> torch.Tensor:
+        """
+        Preprocess (index, file bytes, digest) items into pixel_values, through
+        the on-disk preproc cache (fp16 .npy per image) when it's enabled.
+        """
+        if self.preproc_dir is None:
+            images = [Image.open(io.BytesIO(data)).convert("RGB") for _, data, _ in items]
+            return self.processor(images=images, return_tensors="pt", padding=True)["pixel_values"]
+        
+        arrays = [None] * len(items)
+        misses = []  # (position, file bytes, cache path)
+        
+        for pos, (_, data, digest) in enumerate(items):
+            cache_path = self.preproc_dir / digest[:2] / f"{digest}.npy"
+            try:
+                arrays[pos] = np.load(cache_path)
+                _touch(cache_path)
+            except (OSError, ValueError):
+                misses.append((pos, data, cache_path))
+        
+        if misses:
+            images = [Image.open(io.BytesIO(data)).convert("RGB") for _, data, _ in misses]
+            processed = self.processor(images=images, return_tensors="np", padding=True)["pixel_values"]
+            for (pos, _, cache_path), pixels in zip(misses, processed):
+                arrays[pos] = pixels.astype(np.float16)
+                self._save_npy(cache_path, arrays[pos])
+        
+        return torch.from_numpy(np.stack(arrays).astype(np.float32))
+    
+    def _save_npy(self, cache_path: Path, array: np.ndarray):
+        """Write one cache entry atomically (loader threads may race on it)."""
+        try:
+            cache_path.parent.mkdir(exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning("Could not write cache entry %s: %s", cache_path.name, e)
+    
+    def pick_batch_size(self) -> int:
+        """
+        Images per model forward: settings.EMBEDDING_BATCH_SIZE if set, else
+        sized to half the free GPU memory (CPU keeps DEFAULT_BATCH_SIZE).
+        """
+        if settings.EMBEDDING_BATCH_SIZE:
+            return settings.EMBEDDING_BATCH_SIZE
+        if self.device != "cuda":
+            return DEFAULT_BATCH_SIZE
+        free_bytes, _ = torch.cuda.mem_get_info()
+        return int(min(MAX_BATCH_SIZE, max(MIN_BATCH_SIZE, free_bytes // 2 // GPU_BYTES_PER_IMAGE)))
+    
+    def generate_batch_embeddings(
+        self,
+        image_paths: List[str],
+        batch_size: int = None,
+        num_workers: int = None
+    ) -> np.ndarray:
         """
         Generate embeddings for multiple images in batches.
         Returns: numpy array of shape (num_images, embedding_dim)
         """
-        embeddings = []
+        if not image_paths:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+        return np.vstack(list(self.iter_batch_embeddings(image_paths, batch_size, num_workers)))
+    
+    def iter_batch_embeddings(
+        self,
+        image_paths: List[str],
+        batch_size: int = None,
+        num_workers: int = None
+    ) -> Iterator[np.ndarray]:
+        """
+        Generate embeddings batch by batch, in image_paths order, so callers
+        can consume them without holding the full (N, dim) matrix.
+        Images are decoded/preprocessed in LOAD_CHUNK_SIZE chunks on a thread
+        pool while the model runs, so decode and inference overlap; chunks are
+        gathered into groups of batch_size images (default: pick_batch_size())
+        whose cache misses run in one forward.
+        (Threads rather than DataLoader worker processes: Celery's prefork
+        workers are daemonic and can't spawn children. Reads, hashing and
+        decoding release the GIL; mostly-cached runs on slow or networked
+        storage are I/O-bound and can use more workers than CPUs, see
+        settings.EMBEDDING_LOADER_WORKERS.)
+        Yields: numpy arrays of shape (n, embedding_dim)
+        """
+        batch_size = batch_size or self.pick_batch_size()
+        num_workers = num_workers or settings.EMBEDDING_LOADER_WORKERS or min(8, os.cpu_count() or 1)
+        chunks = iter([image_paths[i:i + LOAD_CHUNK_SIZE] for i in range(0, len(image_paths), LOAD_CHUNK_SIZE)])
+        processed = 0
         
-        for i in range(0, len(image_paths), batch_size):
-            batch_paths = image_paths[i:i + batch_size]
-            
-            # Load batch of images
-            images = [Image.open(path).convert("RGB") for path in batch_paths]
+        with ThreadPoolExecutor(max_workers=num_workers) as pool:
+            # Keep a bounded number of chunks in flight to cap memory
+            pending = deque(pool.submit(self._load_batch, c) for c in islice(chunks, num_workers + 1))
+            group = []  # Loaded chunks waiting for the model
+            group_size = 0
             
-            # Process batch
-            inputs = self.processor(images=images, return_tensors="pt", padding=True)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            # Generate embeddings
-            with torch.no_grad():
-                outputs = self.model.get_image_features(**inputs)
-                batch_embeddings = outputs.cpu().numpy()
-            
-            # Normalize
-            batch_embeddings = batch_embeddings / np.linalg.norm(batch_embeddings, axis=1, keepdims=True)
-            
-            embeddings.append(batch_embeddings)
-            
-            print(f"  Processed {min(i + batch_size, len(image_paths))}/{len(image_paths)} images")
+            while pending:
+                loaded = pending.popleft().result()
+                next_chunk = next(chunks, None)
+                if next_chunk is not None:
+                    pending.append(pool.submit(self._load_batch, next_chunk))
+                
+                group.append(loaded)
+                group_size += len(loaded[0])
+                if group_size < batch_size and pending:
+                    continue
+                
+                cached = group_size - sum(len(misses) for _, _, misses in group)
+                embeddings = self._embed_group(group)
+                processed += len(embeddings)
+                logger.debug("Processed %d/%d images (%d cached)", processed, len(image_paths), cached)
+                group, group_size = [], 0
+                yield embeddings
+        
+        self.prune_caches()
+    
+    def prune_caches(self):
+        """Bound the enabled on-disk caches (EMBEDDING_CACHE_MAX_MB, PREPROC_CACHE_MAX_MB)."""
+        for cache_dir, max_mb in (
+            (self.embedding_cache_dir, settings.EMBEDDING_CACHE_MAX_MB),
+            (self.preproc_dir, settings.PREPROC_CACHE_MAX_MB),
+        ):
+            if cache_dir is None or not max_mb:
+                continue
+            # Bound the whole cache root: entries of other models/configs count too
+            removed = prune_cache(cache_dir.parent, max_mb * 1024 * 1024)
+            if removed:
+                logger.info("Evicted %d entries from %s", removed, cache_dir.parent)
+    
+    def _embed_group(self, group: list) -> np.ndarray:
+        """
+        Embed the cache misses of several loaded chunks in one forward and
+        merge them with the cached embeddings.
+        Returns: (n, embedding_dim) array covering every image of the group
+        """
+        pixel_values = [
+            # Copy each (pinned) chunk to the device as-is, then concatenate there
+            chunk_pixels.to(self.device, dtype=self.dtype, non_blocking=True)
+            for _, chunk_pixels, misses in group if misses
+        ]
+        if pixel_values:
+            new_embeddings = iter(self._embed_adaptive(torch.cat(pixel_values)))
+            for embeddings, _, misses in group:
+                for i, cache_path in misses:
+                    embeddings[i] = next(new_embeddings)
+                    if cache_path is not None:
+                        self._save_npy(cache_path, embeddings[i])
         
-        return np.vstack(embeddings)
+        return np.stack([embedding for embeddings, _, _ in group for embedding in embeddings])
+    
+    def _embed_adaptive(self, pixel_values: torch.Tensor) -> np.ndarray:
+        """
+        _embed in slices of at most self._max_forward images. On CUDA OOM the
+        limit is halved (for the rest of this generator's life) and the
+        failing slice retried.
+        """
+        outputs = []
+        start = 0
+        while start < len(pixel_values):
+            size = min(self._max_forward or len(pixel_values), len(pixel_values) - start)
+            try:
+                outputs.append(self._embed(pixel_values[start:start + size]))
+                start += size
+            except torch.cuda.OutOfMemoryError:
+                if size == 1:
+                    raise
+                torch.cuda.empty_cache()
+                self._max_forward = size // 2
+                logger.warning("CUDA out of memory at batch %d, retrying with %d", size, self._max_forward)
+        return np.concatenate(outputs)
+
+
+def vector_index_path(project_id: str) -> Path:
+    """Path of a project's FAISS index file."""
+    return Path(settings.DATA_DIR) / "projects" / project_id / "embeddings" / "faiss.index"
 
 
 class FAISSVectorStore:
     """Simple FAISS vector store for similarity search."""
     
-    def __init__(self, project_id: str, embedding_dim: int = 512):
+    def __init__(self, project_id: str, embedding_dim: int = 512, read_only: bool = False):
+        """
+        read_only stores open the index with IO_FLAG_MMAP: faiss maps the
+        inverted lists of IVF indexes ("ivfpq") instead of reading them into
+        the heap, so processes opening the same index share those pages.
+        Flat, SQ and HNSW indexes are still read into memory. Don't add to
+        or save read_only stores.
+        """
         self.project_id = project_id
         self.embedding_dim = embedding_dim
+        self.read_only = read_only
         
         # FAISS index directory
-        self.index_dir = Path(settings.DATA_DIR) / "projects" / project_id / "embeddings"
+        self.index_path = vector_index_path(project_id)
+        self.index_dir = self.index_path.parent
         self.index_dir.mkdir(parents=True, exist_ok=True)
-        self.index_path = self.index_dir / "faiss.index"
         self.mapping_path = self.index_dir / "id_mapping.npy"
+        self.vectors_path = self.index_dir / "vectors.npy"  # Raw vectors, memory-mapped on read
         
         # Create or load index
         if self.index_path.exists():
@@ -106,41 +432,202 @@ class FAISSVectorStore:
             self.create_index()
     
     def create_index(self):
-        """Create a new FAISS index (simple flat L2 index)."""
-        # Using IndexFlatL2 - simple and accurate
-        # For larger datasets, could use IndexIVFFlat for speed
-        self.index = faiss.IndexFlatL2(self.embedding_dim)
+        """
+        Create a new FAISS index.
+        "hnsw" (default) gives sub-linear approximate search; "flat" is exact
+        brute force; "ivfpq" compresses vectors to FAISS_IVFPQ_M bytes and
+        needs training. "auto" defers the choice to the first save, when the
+        project size is known (see _build_pending_index).
+        See settings.FAISS_INDEX_TYPE.
+        With FAISS_VECTOR_DTYPE="fp16" (default) flat and HNSW vectors are
+        stored as half precision scalar-quantized codes: half the memory and
+        bandwidth, and no training needed. Unit-norm CLIP vectors lose nothing
+        that matters for ranking at fp16. "int8" quarters them instead, with
+        per-dimension ranges trained on the vectors (so it's deferred too).
+        """
         self.image_ids = []  # Map FAISS index to image IDs
-        print(f"Created new FAISS index (dim={self.embedding_dim})")
+        self._all_embeddings = None
+        self._added = []  # Exact vectors the index can't give back yet (see add_embeddings)
+        self._num_saved = 0  # Leading index rows the vectors file holds
+        if settings.FAISS_INDEX_TYPE in ("auto", "ivfpq") or settings.FAISS_VECTOR_DTYPE == "int8":
+            # Built once all vectors are in: size picks the type, and IVF-PQ / int8 train on them
+            self.index = None
+            logger.info("Deferred %s FAISS index (dim=%d)", settings.FAISS_INDEX_TYPE, self.embedding_dim)
+            return
+        self.index = self._new_index(settings.FAISS_INDEX_TYPE)
+        logger.info(
+            "Created new %s/%s FAISS index (dim=%d)",
+            settings.FAISS_INDEX_TYPE, settings.FAISS_VECTOR_DTYPE, self.embedding_dim
+        )
+    
+    def _new_index(self, index_type: str, num_vectors: int = 0) -> faiss.Index:
+        """Build an empty index of index_type ("ivfpq" is sized for num_vectors and still untrained)."""
+        # Embeddings are L2-normalized, so inner product == cosine similarity
+        # and ranks the same as L2 (||a-b||^2 = 2 - 2<a,b>), with faster kernels.
+        scalar_quantized = settings.FAISS_VECTOR_DTYPE in ("fp16", "int8")
+        if settings.FAISS_VECTOR_DTYPE == "int8":
+            qtype = faiss.ScalarQuantizer.QT_8bit
+        else:
+            qtype = faiss.ScalarQuantizer.QT_fp16
+        if index_type == "flat":
+            if scalar_quantized:
+                return faiss.IndexScalarQuantizer(self.embedding_dim, qtype, faiss.METRIC_INNER_PRODUCT)
+            return faiss.IndexFlatIP(self.embedding_dim)
+        
+        if index_type == "ivfpq":
+            # ~4 sqrt(N) lists, capped so k-means gets its ~39 points per list
+            nlist = max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors // 39))
+            m = settings.FAISS_IVFPQ_M
+            while self.embedding_dim % m:
+                m -= 1  # Sub-quantizers must divide the dimension
+            quantizer = faiss.IndexFlatIP(self.embedding_dim)
+            index = faiss.IndexIVFPQ(quantizer, self.embedding_dim, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+            index.nprobe = settings.FAISS_IVF_NPROBE
+            return index
+        
+        if scalar_quantized:
+            index = faiss.IndexHNSWSQ(
+                self.embedding_dim, qtype, settings.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT
+            )
+        else:
+            index = faiss.IndexHNSWFlat(
+                self.embedding_dim, settings.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT
+            )
+        index.hnsw.efConstruction = settings.FAISS_HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
+        return index
+    
+    def _build_pending_index(self):
+        """
+        Create a deferred index from the vectors added so far.
+        "auto" picks flat / ivfpq / hnsw by count (FAISS_AUTO_FLAT_MAX,
+        FAISS_AUTO_IVFPQ_MAX). Indexes that need training (IVF-PQ, int8)
+        train on a ~10% random sample, at least enough points for IVF-PQ's
+        coarse and PQ k-means.
+        """
+        if self.index is not None:
+            return
+        vectors = np.concatenate(self._added) if self._added else np.empty((0, self.embedding_dim), dtype=np.float32)
+        n = len(vectors)
+        
+        index_type = settings.FAISS_INDEX_TYPE
+        if index_type == "auto":
+            if n < settings.FAISS_AUTO_FLAT_MAX:
+                index_type = "flat"
+            elif n < settings.FAISS_AUTO_IVFPQ_MAX:
+                index_type = "ivfpq"
+            else:
+                index_type = "hnsw"
+        if index_type == "ivfpq" and n < 256:
+            index_type = "flat"  # Too few vectors to train PQ codebooks
+        
+        self.index = self._new_index(index_type, n)
+        if not self.index.is_trained and n:
+            sample_size = min(n, max(n // 10, 39 * max(getattr(self.index, "nlist", 1), 256)))
+            sample = vectors[np.random.default_rng(0).choice(n, size=sample_size, replace=False)]
+            logger.info("Training %s index on %d vectors", index_type, sample_size)
+            self.index.train(sample)
+        if n:
+            self.index.add(vectors)
+        if not self._lossy():
+            self._added = []  # The index reconstructs them now
+        logger.info("Created new %s FAISS index with %d embeddings (dim=%d)", index_type, n, self.embedding_dim)
+    
+    def _lossy(self) -> bool:
+        """Whether reconstructing from the index loses more than the fp16 vectors file does."""
+        return faiss.try_extract_index_ivf(self.index) is not None or settings.FAISS_VECTOR_DTYPE == "int8"
     
     def add_embeddings(self, embeddings: np.ndarray, image_ids: List[str]):
-        """Add embeddings to the index."""
-        # Ensure float32 (FAISS requirement)
-        embeddings = embeddings.astype(np.float32)
+        """
+        Add embeddings to the index.
+        Only a deferred index or a lossy one (IVF-PQ, int8) keeps the fp32
+        batches until save; flat and HNSW give them back via reconstruct_n,
+        so streaming writers don't hold the full matrix.
+        """
+        # Ensure C-contiguous float32 (FAISS requirement); no copy if it already is
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
         
         # Add to index
-        self.index.add(embeddings)
+        if self.index is not None:
+            self.index.add(embeddings)
+        if self.index is None or self._lossy():
+            self._added.append(embeddings)
         self.image_ids.extend(image_ids)
+        self._all_embeddings = None
         
-        print(f"Added {len(image_ids)} embeddings to index")
+        logger.debug("Added %d embeddings to index", len(image_ids))
     
     def save_index(self):
-        """Save index and ID mapping to disk."""
-        faiss.write_index(self.index, str(self.index_path))
-        np.save(self.mapping_path, np.array(self.image_ids))
-        print(f"💾 Saved index to {self.index_path}")
+        """
+        Save index, ID mapping and raw vectors to disk. Each call rewrites
+        the whole index, so writers add everything first and save once.
+        """
+        self._build_pending_index()
+        
+        # Write to temp files and swap them in: readers may have the old files mmapped.
+        # The index goes last: get_vector_store reloads on its mtime, so a reader
+        # never caches the new index with the previous mapping.
+        self._save_mapping()
+        
+        if self.index.ntotal > 0:
+            # int8 codes are index-only: the vectors file stays fp16 for selection math
+            dtype = np.float32 if settings.FAISS_VECTOR_DTYPE == "fp32" else np.float16
+            tmp_path = self.vectors_path.with_name("vectors.tmp.npy")
+            # Filled chunk by chunk, so the full fp32 matrix is never in memory
+            out = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=dtype, shape=(self.index.ntotal, self.embedding_dim)
+            )
+            start = 0
+            for chunk in self._iter_vectors():
+                out[start:start + len(chunk)] = chunk
+                start += len(chunk)
+            out.flush()
+            del out
+            os.replace(tmp_path, self.vectors_path)
+        
+        tmp_index_path = self.index_path.with_name("faiss.index.tmp")
+        faiss.write_index(self.index, str(tmp_index_path))
+        os.replace(tmp_index_path, self.index_path)
+        self._added = []  # Covered by the vectors file now
+        self._num_saved = self.index.ntotal
+        logger.info("Saved index to %s", self.index_path)
+    
+    def _save_mapping(self):
+        """Write the ID mapping through a temp file, swapped in with os.replace."""
+        # Fixed-width unicode array: loads as one contiguous read, no pickle
+        tmp_mapping_path = self.mapping_path.with_name("id_mapping.tmp.npy")
+        np.save(tmp_mapping_path, np.asarray(self.image_ids, dtype=str))
+        os.replace(tmp_mapping_path, self.mapping_path)
     
     def load_index(self):
-        """Load index and ID mapping from disk."""
-        self.index = faiss.read_index(str(self.index_path))
-        self.image_ids = list(np.load(self.mapping_path, allow_pickle=True))
-        print(f"📂 Loaded index with {len(self.image_ids)} embeddings")
+        """Load index and ID mapping from disk (IVF lists memory-mapped when read_only)."""
+        if self.read_only:
+            self.index = faiss.read_index(str(self.index_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        else:
+            self.index = faiss.read_index(str(self.index_path))
+        if not self.index.is_trained:
+            self.index = None  # Saved empty before it could train: defer again
+        try:
+            self.image_ids = np.load(self.mapping_path).tolist()
+        except ValueError:
+            # Legacy object-dtype mapping: rewrite it without pickle, unless this
+            # is a read-only store (the next writable save migrates it)
+            self.image_ids = [str(i) for i in np.load(self.mapping_path, allow_pickle=True)]
+            if not self.read_only:
+                self._save_mapping()
+        self._all_embeddings = None
+        self._added = []
+        self._num_saved = self.index.ntotal if self.index is not None else 0
+        logger.info("Loaded index with %d embeddings", len(self.image_ids))
     
     def search_similar(self, query_embedding: np.ndarray, k: int = 10) -> List[Tuple[str, float]]:
         """
         Search for similar embeddings.
-        Returns: list of (image_id, distance) tuples
+        Returns: list of (image_id, score) tuples, most similar first.
+        Score is cosine similarity for inner-product indexes (higher is closer)
+        and L2 distance for older L2 indexes loaded from disk (lower is closer).
         """
+        self._build_pending_index()
         query_embedding = query_embedding.reshape(1, -1).astype(np.float32)
         distances, indices = self.index.search(query_embedding, k)
         
@@ -152,13 +639,75 @@ class FAISSVectorStore:
         return results
     
     def get_all_embeddings(self) -> np.ndarray:
-        """Get all embeddings from the index."""
+        """
+        Get all embeddings from the index as float32.
+        Uses the memory-mapped vectors file when it matches the index,
+        otherwise joins what it covers with vectors reconstructed from the
+        index (see _iter_vectors). The matrix is reused until the index changes.
+        An fp16 vectors file is upcast on load: half the bytes to read, and
+        numpy matrix products have no fast fp16 path. Vectors added since
+        load are appended exactly (IVF-PQ reconstructions are lossy).
+        """
+        self._build_pending_index()
         if self.index.ntotal == 0:
             return np.array([])
         
-        # Reconstruct all vectors from index
-        embeddings = np.zeros((self.index.ntotal, self.embedding_dim), dtype=np.float32)
-        for i in range(self.index.ntotal):
-            embeddings[i] = self.index.reconstruct(i)
+        if self._all_embeddings is not None:
+            return self._all_embeddings
         
+        vectors = None
+        if not self._added and self._num_saved == self.index.ntotal and self.vectors_path.exists():
+            vectors = np.load(self.vectors_path, mmap_mode="r")
+        if vectors is not None and vectors.shape == (self.index.ntotal, self.embedding_dim):
+            embeddings = vectors if vectors.dtype == np.float32 else vectors.astype(np.float32)
+        else:
+            embeddings = np.concatenate(list(self._iter_vectors()))
+        self._all_embeddings = embeddings
         return embeddings
+
+
+    def _iter_vectors(self, chunk_size: int = 65536):
+        """
+        Yield every vector in index order as float32 chunks: the rows the
+        vectors file covers, then the ones only the index has, then the
+        buffered exact ones.
+        """
+        num_buffered = sum(len(v) for v in self._added)
+        num_indexed = self.index.ntotal - num_buffered
+        
+        num_file = 0
+        if self._num_saved and self.vectors_path.exists():
+            vectors = np.load(self.vectors_path, mmap_mode="r")
+            if vectors.shape == (self._num_saved, self.embedding_dim):
+                num_file = min(self._num_saved, num_indexed)
+                for start in range(0, num_file, chunk_size):
+                    yield np.asarray(vectors[start:min(start + chunk_size, num_file)], dtype=np.float32)
+        
+        if num_file < num_indexed:
+            # IVF needs its id -> list map to reconstruct
+            ivf = faiss.try_extract_index_ivf(self.index)
+            if ivf is not None and not self.read_only:
+                ivf.make_direct_map()
+            for start in range(num_file, num_indexed, chunk_size):
+                yield self.index.reconstruct_n(start, min(chunk_size, num_indexed - start))
+        
+        yield from self._added
+
+
+@lru_cache(maxsize=32)
+def _load_vector_store(project_id: str, index_mtime: Optional[int]) -> FAISSVectorStore:
+    """Load a store once per (project, index file version)."""
+    return FAISSVectorStore(project_id, read_only=True)
+
+
+def get_vector_store(project_id: str) -> FAISSVectorStore:
+    """
+    Get a read-only, in-process cached vector store for a project.
+    Reloaded automatically when the index file on disk changes.
+    Don't add to the returned store; create a FAISSVectorStore for writes.
+    """
+    try:
+        index_mtime = vector_index_path(project_id).stat().st_mtime_ns
+    except FileNotFoundError:
+        index_mtime = None
+    return _load_vector_store(project_id, index_mtime)
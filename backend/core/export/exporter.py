@@ -2,13 +2,46 @@
 Export module.
 Export annotations in different formats (YOLO, COCO, VOC).
 """
-import json
+import gzip
+import os
+import orjson
 import yaml
+import numpy as np
+from collections import defaultdict
 from pathlib import Path
 from typing import List, Dict
 import shutil
 
 
+def _label_line(class_idx: int, bbox: Dict) -> str:
+    """One YOLO label line: class_id center_x center_y width height."""
+    return f"{class_idx} {bbox['x']} {bbox['y']} {bbox['w']} {bbox['h']}\n"
+
+
+def _link_or_copy(src: Path, dst: Path, use_symlinks: bool = True):
+    """
+    Place src at dst as a symlink, else a hardlink, else a copy.
+    Raises FileNotFoundError for a missing src, as the copy would, rather
+    than leaving a dangling link in the export.
+    """
+    if not src.exists():
+        raise FileNotFoundError(f"Source image not found: {src}")
+    if dst.is_symlink() or dst.exists():
+        dst.unlink()  # Re-export: replace whatever the last run left
+    if use_symlinks:
+        try:
+            os.symlink(src.resolve(), dst)
+            return
+        except (OSError, NotImplementedError):
+            pass
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
 class AnnotationExporter:
     """Export annotations in various formats."""
     
@@ -18,15 +51,35 @@ class AnnotationExporter:
         self.export_dir = self.project_dir / "exports"
         self.export_dir.mkdir(parents=True, exist_ok=True)
     
+    def _version_file(self, output_name: str) -> Path:
+        return self.export_dir / f".{output_name}.version"
+    
+    def get_export_version(self, output_name: str):
+        """Get the data version an existing export was built from (None if absent)."""
+        version_file = self._version_file(output_name)
+        if not version_file.exists() or not (self.export_dir / output_name).exists():
+            return None
+        try:
+            return int(version_file.read_text().strip())
+        except ValueError:
+            return None
+    
+    def set_export_version(self, output_name: str, version: int):
+        """Record the data version an export was built from."""
+        self._version_file(output_name).write_text(str(version))
+    
     def export_yolo(
         self,
         images: List[Dict],
         annotations: List[Dict],
         classes: List[Dict],
-        output_name: str = "yolo_export"
+        output_name: str = "yolo_export",
+        use_symlinks: bool = True
     ) -> str:
         """
         Export in YOLO format.
+        Images are symlinked (or hardlinked) into the export instead of
+        copied; pass use_symlinks=False for a self-contained copy.
         Returns: path to exported zip file
         """
         export_path = self.export_dir / output_name
@@ -40,28 +93,28 @@ class AnnotationExporter:
         class_map = {cls["id"]: idx for idx, cls in enumerate(classes)}
         
         # Group annotations by image
-        img_annotations = {}
+        img_annotations = defaultdict(list)
         for ann in annotations:
-            img_id = ann["image_id"]
-            if img_id not in img_annotations:
-                img_annotations[img_id] = []
-            img_annotations[img_id].append(ann)
+            img_annotations[ann["image_id"]].append(ann)
         
         # Copy images and create label files
         for img in images:
-            # Copy image
+            # Link (or copy) image
             src = Path(img["file_path"])
             dst = images_dir / img["filename"]
-            shutil.copy2(src, dst)
+            _link_or_copy(src, dst, use_symlinks)
             
-            # Create label file
-            label_file = labels_dir / f"{Path(img['filename']).stem}.txt"
-            with open(label_file, "w") as f:
-                if img["id"] in img_annotations:
-                    for ann in img_annotations[img["id"]]:
-                        bbox = ann["bbox"]
-                        class_idx = class_map[ann["class_id"]]
-                        f.write(f"{class_idx} {bbox['x']} {bbox['y']} {bbox['w']} {bbox['h']}\n")
+            # Create label file (one write per image)
+            label_file = labels_dir / f"{os.path.splitext(img['filename'])[0]}.txt"
+            lines = [
+                _label_line(class_map[ann["class_id"]], ann["bbox"])
+                for ann in img_annotations.get(img["id"], [])
+            ]
+            if lines:
+                label_file.write_text("".join(lines))
+            else:
+                # No boxes: YOLO reads a missing label file as background
+                label_file.unlink(missing_ok=True)
         
         # Create data.yaml
         data_yaml = {
@@ -83,10 +136,12 @@ class AnnotationExporter:
         images: List[Dict],
         annotations: List[Dict],
         classes: List[Dict],
-        output_name: str = "coco_export.json"
+        output_name: str = "coco_export.json",
+        pretty: bool = False
     ) -> str:
         """
         Export in COCO format.
+        Written compact unless pretty=True (2-space indent).
         Returns: path to exported JSON file
         """
         coco_data = {
@@ -117,36 +172,45 @@ class AnnotationExporter:
                 "height": img["height"]
             })
         
-        # Annotations
-        for idx, ann in enumerate(annotations):
-            bbox = ann["bbox"]
-            
-            # Convert from YOLO (center x, y, w, h) to COCO (top-left x, y, w, h)
-            img = next(i for i in images if i["id"] == ann["image_id"])
-            img_width = img["width"]
-            img_height = img["height"]
-            
-            x_center = bbox["x"] * img_width
-            y_center = bbox["y"] * img_height
-            width = bbox["w"] * img_width
-            height = bbox["h"] * img_height
-            
-            x_min = x_center - width / 2
-            y_min = y_center - height / 2
-            
+        # Annotations: convert from YOLO (normalized center x, y, w, h) to
+        # COCO (absolute top-left x, y, w, h) for all boxes at once
+        images_by_id = {img["id"]: img for img in images}
+        n = len(annotations)
+        bx = np.fromiter((ann["bbox"]["x"] for ann in annotations), dtype=np.float64, count=n)
+        by = np.fromiter((ann["bbox"]["y"] for ann in annotations), dtype=np.float64, count=n)
+        bw = np.fromiter((ann["bbox"]["w"] for ann in annotations), dtype=np.float64, count=n)
+        bh = np.fromiter((ann["bbox"]["h"] for ann in annotations), dtype=np.float64, count=n)
+        img_width = np.fromiter((images_by_id[ann["image_id"]]["width"] for ann in annotations), dtype=np.float64, count=n)
+        img_height = np.fromiter((images_by_id[ann["image_id"]]["height"] for ann in annotations), dtype=np.float64, count=n)
+        
+        width = bw * img_width
+        height = bh * img_height
+        x_min = bx * img_width - width / 2
+        y_min = by * img_height - height / 2
+        area = width * height
+        
+        for idx, (ann, x, y, w, h, a) in enumerate(zip(
+            annotations, x_min.tolist(), y_min.tolist(), width.tolist(), height.tolist(), area.tolist()
+        )):
             coco_data["annotations"].append({
                 "id": idx + 1,
                 "image_id": image_map[ann["image_id"]],
                 "category_id": class_map[ann["class_id"]],
-                "bbox": [x_min, y_min, width, height],
-                "area": width * height,
+                "bbox": [x, y, w, h],
+                "area": a,
                 "iscrowd": 0
             })
         
         # Save JSON
         output_path = self.export_dir / output_name
-        with open(output_path, "w") as f:
-            json.dump(coco_data, f, indent=2)
+        options = orjson.OPT_APPEND_NEWLINE | (orjson.OPT_INDENT_2 if pretty else 0)
+        payload = orjson.dumps(coco_data, option=options)
+        with open(output_path, "wb") as f:
+            f.write(payload)
+        
+        # Precompressed copy so downloads don't re-gzip on every request
+        with gzip.open(f"{output_path}.gz", "wb", compresslevel=6) as dst:
+            dst.write(payload)
         
         print(f"Exported COCO format to {output_path}")
         return str(output_path)
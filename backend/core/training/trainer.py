@@ -2,12 +2,65 @@
 Training module for few-shot object detection.
 Uses YOLOv8 with transfer learning.
 """
+import copy
+import logging
 import os
+import shutil
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from ultralytics import YOLO
-from typing import List, Dict
+from typing import Callable, Dict, List, Optional
 import yaml
 from config import settings
+from core.export.exporter import _label_line
+
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(settings.DATA_DIR)
+PROJECTS_DIR = DATA_DIR / "projects"
+# Shared, persistent home for pretrained checkpoints (ultralytics downloads
+# a missing checkpoint to the path it's given instead of the CWD)
+PRETRAINED_DIR = Path(settings.MODELS_DIR) / "pretrained"
+
+LOG_BUFFER_SIZE = 1 << 16
+LOG_FLUSH_INTERVAL = 1.0  # seconds between training.log flushes
+
+LABEL_WRITE_WORKERS = 8  # threads writing training label files
+
+
+def _relocate_to_data_dir(path: Path) -> Path:
+    """
+    Rebuild a stored path from its projects/xxx/images/filename portion
+    under the current DATA_DIR. Returns path unchanged if it has none.
+    """
+    _, sep, rel = str(path).replace('\\', '/').partition('projects/')
+    return PROJECTS_DIR / rel if sep else path
+
+
+def _write_label_file(item):
+    """Write one (path, contents) label file; no boxes means no file (background)."""
+    label_file, contents = item
+    if contents:
+        label_file.write_text(contents)
+    else:
+        label_file.unlink(missing_ok=True)
+
+
+def _pretrained_weights_path(model_name: str) -> str:
+    """Place bare checkpoint names (e.g. "yolov8n.pt") under PRETRAINED_DIR."""
+    if os.path.dirname(model_name):
+        return model_name
+    PRETRAINED_DIR.mkdir(parents=True, exist_ok=True)
+    return str(PRETRAINED_DIR / model_name)
+
+
+@lru_cache(maxsize=4)
+def _load_pretrained(weights: str) -> YOLO:
+    """Load a pretrained checkpoint once per process; train on deep copies."""
+    return YOLO(weights)
 
 
 class FewShotTrainer:
@@ -17,7 +70,7 @@ class FewShotTrainer:
     
     def __init__(self, project_id: str):
         self.project_id = project_id
-        self.project_dir = Path(settings.DATA_DIR) / "projects" / project_id
+        self.project_dir = PROJECTS_DIR / project_id
         self.models_dir = self.project_dir / "models"
         self.models_dir.mkdir(parents=True, exist_ok=True)
     
@@ -44,48 +97,45 @@ class FewShotTrainer:
             src = Path(img["file_path"])
             # Handle path mismatches: stored path might not match current DATA_DIR
             if not src.exists():
-                # Try reconstructing from DATA_DIR + relative path
-                # Extract the relative portion (projects/xxx/images/filename)
-                parts = str(src).replace('\\', '/')
-                if 'projects/' in parts:
-                    rel = parts[parts.index('projects/'):]
-                    src = Path(settings.DATA_DIR) / rel
+                src = _relocate_to_data_dir(src)
             dst = train_images / img["filename"]
             if not dst.exists():
                 try:
                     if src.exists():
                         os.symlink(src.resolve(), dst)
                     else:
-                        print(f"Warning: source image not found: {src}")
-                except Exception:
-                    import shutil
+                        logger.warning("Source image not found: %s", src)
+                except (OSError, NotImplementedError):
+                    # No symlinks here: plain content copy (copyfile uses sendfile
+                    # on Linux; metadata isn't needed for a training copy)
                     if src.exists():
-                        shutil.copy2(src, dst)
+                        shutil.copyfile(src, dst)
         
         # Write label files (YOLO format: class_id center_x center_y width height)
         # Group annotations by image
-        img_annotations = {}
+        img_annotations = defaultdict(list)
         for ann in annotations:
-            img_id = ann["image_id"]
-            if img_id not in img_annotations:
-                img_annotations[img_id] = []
-            img_annotations[img_id].append(ann)
+            img_annotations[ann["image_id"]].append(ann)
         
         # Create class_id mapping
         class_map = {cls["id"]: idx for idx, cls in enumerate(classes)}
         
-        # Write label files
+        # Build label contents (YOLO format, one write per image)
+        label_files = []
         for img in images:
             img_id = img["id"]
-            label_file = train_labels / f"{Path(img['filename']).stem}.txt"
-            
-            with open(label_file, "w") as f:
-                if img_id in img_annotations:
-                    for ann in img_annotations[img_id]:
-                        bbox = ann["bbox"]
-                        class_idx = class_map[ann["class_id"]]
-                        # YOLO format
-                        f.write(f"{class_idx} {bbox['x']} {bbox['y']} {bbox['w']} {bbox['h']}\n")
+            label_file = train_labels / f"{os.path.splitext(img['filename'])[0]}.txt"
+            lines = [
+                _label_line(class_map[ann["class_id"]], ann["bbox"])
+                for ann in img_annotations.get(img_id, [])
+            ]
+            label_files.append((label_file, "".join(lines)))
+        
+        # Write label files; the cost is mostly per-file open/close metadata work,
+        # which overlaps well across threads
+        with ThreadPoolExecutor(max_workers=LABEL_WRITE_WORKERS) as pool:
+            # Consume the results so a failed write raises here
+            list(pool.map(_write_label_file, label_files))
         
         # Create data.yaml
         data_yaml = {
@@ -99,7 +149,7 @@ class FewShotTrainer:
         with open(data_yaml_path, "w") as f:
             yaml.dump(data_yaml, f)
         
-        print(f"Prepared YOLO dataset at {yolo_dir}")
+        logger.info("Prepared YOLO dataset at %s", yolo_dir)
         return str(data_yaml_path)
     
     def train(
@@ -108,46 +158,65 @@ class FewShotTrainer:
         epochs: int = 50,
         batch_size: int = 16,
         img_size: int = 640,
-        model_name: str = "yolov8n.pt"
+        model_name: str = "yolov8n.pt",
+        on_epoch_end: Optional[Callable[[int, int], None]] = None
     ) -> str:
         """
         Train YOLOv8 model.
         Captures all output to a log file for frontend streaming.
+        on_epoch_end(epoch, epochs) is called after each epoch (1-based).
         Returns: path to best model weights
         """
         import sys
+        import threading
         
         log_file_path = self.project_dir / "training.log"
         
-        # TeeWriter: writes to both original stream and log file
+        # TeeWriter: writes to both original stream and log file.
+        # Writes are buffered; flush() (and the flusher thread below) push them out.
         class TeeWriter:
             def __init__(self, original, log_fh):
                 self.original = original
                 self.log_fh = log_fh
             def write(self, text):
                 self.original.write(text)
-                self.original.flush()
                 self.log_fh.write(text)
-                self.log_fh.flush()
             def flush(self):
                 self.original.flush()
                 self.log_fh.flush()
         
-        log_fh = open(log_file_path, "w")
+        log_fh = open(log_file_path, "w", buffering=LOG_BUFFER_SIZE)
+        # This module's log lines (the status header the frontend shows) go to the file too
+        log_handler = logging.StreamHandler(log_fh)
+        log_handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(log_handler)
+        # INFO explicitly: under the default WARNING root level the header would be dropped
+        old_level = logger.level
+        logger.setLevel(logging.INFO)
         old_stdout = sys.stdout
         old_stderr = sys.stderr
         sys.stdout = TeeWriter(old_stdout, log_fh)
         sys.stderr = TeeWriter(old_stderr, log_fh)
         
+        # Flush the log periodically so the frontend's log view keeps streaming
+        stop_flushing = threading.Event()
+        def flush_log():
+            while not stop_flushing.wait(LOG_FLUSH_INTERVAL):
+                log_fh.flush()
+        flusher = threading.Thread(target=flush_log, daemon=True)
+        flusher.start()
+        
         try:
-            print(f"Starting training...")
-            print(f"   Model: {model_name}")
-            print(f"   Epochs: {epochs}")
-            print(f"   Batch size: {batch_size}")
-            print(f"   Log file: {log_file_path}")
+            logger.info("Starting training...")
+            logger.info("   Model: %s", model_name)
+            logger.info("   Epochs: %d", epochs)
+            logger.info("   Batch size: %d", batch_size)
+            logger.info("   Log file: %s", log_file_path)
             
-            # Load pretrained model
-            model = YOLO(model_name)
+            # Load pretrained model (training mutates it, so copy the cached one)
+            model = copy.deepcopy(_load_pretrained(_pretrained_weights_path(model_name)))
+            if on_epoch_end:
+                model.add_callback("on_fit_epoch_end", lambda t: on_epoch_end(t.epoch + 1, t.epochs))
             
             # Train
             results = model.train(
@@ -172,14 +241,19 @@ class FewShotTrainer:
             # Best model path
             best_model_path = self.models_dir / "train" / "weights" / "best.pt"
             
-            print(f"Training completed!")
-            print(f"   Best model: {best_model_path}")
+            logger.info("Training completed!")
+            logger.info("   Best model: %s", best_model_path)
             
             return str(best_model_path)
         
         finally:
+            stop_flushing.set()
+            flusher.join()
+            logger.removeHandler(log_handler)
+            logger.setLevel(old_level)
             sys.stdout = old_stdout
             sys.stderr = old_stderr
+            old_stdout.flush()
             log_fh.close()
     
     def get_latest_model(self) -> str:
@@ -2,8 +2,9 @@
 CRUD operations for database.
 Simple helper functions to avoid repeating SQLAlchemy queries.
 """
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
-from db.models import Project, Image, Class, Annotation, Embedding, ProjectStatus, ImageStatus
+from db.models import Project, Image, Class, Annotation, Embedding, ProjectStatus, ImageStatus, generate_uuid
 from typing import List, Optional
 
 
@@ -14,7 +15,6 @@ def create_project(db: Session, name: str, description: str = None) -> Project:
     project = Project(name=name, description=description)
     db.add(project)
     db.commit()
-    db.refresh(project)
     return project
 
 
@@ -34,10 +34,24 @@ def update_project_status(db: Session, project_id: str, status: ProjectStatus):
     if project:
         project.status = status
         db.commit()
-        db.refresh(project)
     return project
 
 
+def bump_annotations_version(db: Session, project_id: str):
+    """Mark a project's exportable data as changed (invalidates cached exports)."""
+    db.query(Project).filter(Project.id == project_id).update(
+        {"annotations_version": Project.annotations_version + 1}, synchronize_session=False
+    )
+
+
+def _bump_annotations_version_for_images(db: Session, image_ids: List[str]):
+    """Bump annotations_version for every project owning one of image_ids."""
+    project_ids = db.query(Image.project_id).filter(Image.id.in_(list(set(image_ids)))).scalar_subquery()
+    db.query(Project).filter(Project.id.in_(project_ids)).update(
+        {"annotations_version": Project.annotations_version + 1}, synchronize_session=False
+    )
+
+
 # ================== Image Operations ==================
 
 def create_image(db: Session, project_id: str, filename: str, file_path: str, 
@@ -51,16 +65,47 @@ def create_image(db: Session, project_id: str, filename: str, file_path: str,
         height=height
     )
     db.add(image)
+    bump_annotations_version(db, project_id)
     db.commit()
-    db.refresh(image)
     return image
 
 
+def create_images_bulk(db: Session, project_id: str, images: List[dict]) -> List[str]:
+    """
+    Create many image records in one bulk INSERT.
+    Each dict has filename, file_path, width and height.
+    Returns: list of created image IDs
+    """
+    objs = [
+        Image(
+            id=generate_uuid(),
+            project_id=project_id,
+            filename=img["filename"],
+            file_path=img["file_path"],
+            width=img["width"],
+            height=img["height"]
+        )
+        for img in images
+    ]
+    db.bulk_save_objects(objs)
+    bump_annotations_version(db, project_id)
+    db.commit()
+    return [obj.id for obj in objs]
+
+
 def get_image(db: Session, image_id: str) -> Optional[Image]:
     """Get image by ID."""
     return db.query(Image).filter(Image.id == image_id).first()
 
 
+def get_images(db: Session, image_ids: List[str]) -> List[Image]:
+    """Get many images by ID in one query, returned in the order of image_ids."""
+    if not image_ids:
+        return []
+    by_id = {img.id: img for img in db.query(Image).filter(Image.id.in_(image_ids)).all()}
+    return [by_id[img_id] for img_id in image_ids if img_id in by_id]
+
+
 def get_project_images(db: Session, project_id: str, status: ImageStatus = None) -> List[Image]:
     """Get all images for a project, optionally filtered by status."""
     query = db.query(Image).filter(Image.project_id == project_id)
@@ -69,14 +114,59 @@ def get_project_images(db: Session, project_id: str, status: ImageStatus = None)
     return query.all()
 
 
-def update_image_status(db: Session, image_id: str, status: ImageStatus):
-    """Update image status."""
-    image = get_image(db, image_id)
-    if image:
-        image.status = status
+IMAGE_LITE_COLUMNS = (Image.id, Image.filename, Image.file_path)
+IMAGE_SIZE_COLUMNS = (Image.width, Image.height)
+
+
+def get_project_images_lite(db: Session, project_id: str, status: ImageStatus = None,
+                            with_size: bool = False) -> List[dict]:
+    """
+    Get {"id", "filename", "file_path"} dicts (plus "width"/"height" with
+    with_size) for a project's images. Selects only those columns, so no
+    ORM objects or identity-map entries are built.
+    """
+    columns = IMAGE_LITE_COLUMNS + IMAGE_SIZE_COLUMNS if with_size else IMAGE_LITE_COLUMNS
+    query = select(*columns).where(Image.project_id == project_id)
+    if status:
+        query = query.where(Image.status == status)
+    return [dict(row) for row in db.execute(query).mappings()]
+
+
+def get_images_lite(db: Session, image_ids: List[str]) -> List[dict]:
+    """get_images as get_project_images_lite dicts, in the order of image_ids."""
+    if not image_ids:
+        return []
+    rows = db.execute(select(*IMAGE_LITE_COLUMNS).where(Image.id.in_(image_ids))).mappings()
+    by_id = {row["id"]: dict(row) for row in rows}
+    return [by_id[img_id] for img_id in image_ids if img_id in by_id]
+
+
+def get_project_image_ids(db: Session, project_id: str, status: ImageStatus = None) -> List[str]:
+    """Get only the IDs of a project's images (no ORM objects are built)."""
+    query = db.query(Image.id).filter(Image.project_id == project_id)
+    if status:
+        query = query.filter(Image.status == status)
+    return [row.id for row in query.all()]
+
+
+def update_image_status(db: Session, image_id: str, status: ImageStatus) -> bool:
+    """Update image status in one UPDATE (no SELECT first). Returns whether the image exists."""
+    return update_images_status(db, [image_id], status) > 0
+
+
+def update_images_status(db: Session, image_ids: List[str], status: ImageStatus, commit: bool = True) -> int:
+    """
+    Update status for many images in a single UPDATE. Returns rows matched.
+    commit=False leaves the transaction open for the caller to commit.
+    """
+    if not image_ids:
+        return 0
+    count = db.query(Image).filter(Image.id.in_(image_ids)).update(
+        {"status": status}, synchronize_session=False
+    )
+    if commit:
         db.commit()
-        db.refresh(image)
-    return image
+    return count
 
 
 # ================== Class Operations ==================
@@ -85,8 +175,9 @@ def create_class(db: Session, project_id: str, name: str, color: str) -> Class:
     """Create a new class."""
     class_obj = Class(project_id=project_id, name=name, color=color)
     db.add(class_obj)
+    bump_annotations_version(db, project_id)
+    bump_classes_version(db, project_id)
     db.commit()
-    db.refresh(class_obj)
     return class_obj
 
 
@@ -95,6 +186,18 @@ def get_project_classes(db: Session, project_id: str) -> List[Class]:
     return db.query(Class).filter(Class.project_id == project_id).all()
 
 
+def bump_classes_version(db: Session, project_id: str):
+    """Mark a project's class list as changed (invalidates cached class maps)."""
+    db.query(Project).filter(Project.id == project_id).update(
+        {"classes_version": Project.classes_version + 1}, synchronize_session=False
+    )
+
+
+def get_classes_version(db: Session, project_id: str) -> int:
+    """Get a project's classes_version (0 if the project doesn't exist)."""
+    return db.query(Project.classes_version).filter(Project.id == project_id).scalar() or 0
+
+
 # ================== Annotation Operations ==================
 
 def create_annotation(db: Session, image_id: str, class_id: int, bbox: dict, 
@@ -108,19 +211,83 @@ def create_annotation(db: Session, image_id: str, class_id: int, bbox: dict,
         source=source
     )
     db.add(annotation)
+    _bump_annotations_version_for_images(db, [image_id])
     db.commit()
-    db.refresh(annotation)
     return annotation
 
 
+def create_annotations_bulk(db: Session, annotations: List[dict]) -> List[int]:
+    """
+    Create many annotations in batched multi-row INSERTs (SQLAlchemy Core,
+    bypasses the ORM unit of work). IDs come back through RETURNING.
+    Each dict has image_id, class_id, bbox and optionally confidence/source.
+    Returns: list of created annotation IDs, in input order
+    """
+    return create_annotation_rows_bulk(db, [
+        {
+            "image_id": ann["image_id"],
+            "class_id": ann["class_id"],
+            "bbox_x": ann["bbox"]["x"],
+            "bbox_y": ann["bbox"]["y"],
+            "bbox_w": ann["bbox"]["w"],
+            "bbox_h": ann["bbox"]["h"],
+            "confidence": ann.get("confidence"),
+            "source": ann.get("source", "manual")
+        }
+        for ann in annotations
+    ])
+
+
+def create_annotation_rows_bulk(db: Session, rows: List[dict], commit: bool = True) -> List[int]:
+    """
+    create_annotations_bulk for rows already in column form: each dict has
+    image_id, class_id, bbox_x, bbox_y, bbox_w, bbox_h, confidence and source.
+    commit=False leaves the transaction open for the caller to commit.
+    Returns: list of created annotation IDs, in input order
+    """
+    if not rows:
+        return []
+    ids = db.scalars(
+        insert(Annotation).returning(Annotation.id, sort_by_parameter_order=True), rows
+    ).all()
+    _bump_annotations_version_for_images(db, [row["image_id"] for row in rows])
+    if commit:
+        db.commit()
+    return list(ids)
+
+
 def get_image_annotations(db: Session, image_id: str) -> List[Annotation]:
     """Get all annotations for an image."""
     return db.query(Annotation).filter(Annotation.image_id == image_id).all()
 
 
+def get_project_annotations(db: Session, project_id: str, status: ImageStatus = None) -> List[dict]:
+    """
+    Get {"image_id", "class_id", "bbox"} dicts for every annotation in a project.
+    Single JOIN query instead of one query per image.
+    """
+    query = db.query(
+        Annotation.image_id, Annotation.class_id,
+        Annotation.bbox_x, Annotation.bbox_y, Annotation.bbox_w, Annotation.bbox_h
+    ).join(
+        Image, Annotation.image_id == Image.id
+    ).filter(Image.project_id == project_id)
+    if status:
+        query = query.filter(Image.status == status)
+    return [
+        {"image_id": image_id, "class_id": class_id, "bbox": {"x": x, "y": y, "w": w, "h": h}}
+        for image_id, class_id, x, y, w, h in query.all()
+    ]
+
+
 def delete_image_annotations(db: Session, image_id: str):
-    """Delete all annotations for an image."""
-    db.query(Annotation).filter(Annotation.image_id == image_id).delete()
+    """
+    Delete all annotations for an image in one server-side DELETE.
+    The session isn't synchronized: Annotation objects already loaded for
+    this image stay in the identity map, so don't reuse them afterwards.
+    """
+    db.query(Annotation).filter(Annotation.image_id == image_id).delete(synchronize_session=False)
+    _bump_annotations_version_for_images(db, [image_id])
     db.commit()
 
 
@@ -131,13 +298,41 @@ def create_embedding_record(db: Session, image_id: str, model_name: str) -> Embe
     embedding = Embedding(image_id=image_id, model_name=model_name)
     db.add(embedding)
     db.commit()
-    db.refresh(embedding)
     return embedding
 
 
+def create_embedding_records_bulk(db: Session, image_ids: List[str], model_name: str, commit: bool = True) -> int:
+    """
+    Create embedding records for many images in one executemany INSERT.
+    Images that already have a record are skipped (image_id is unique).
+    commit=False leaves the transaction open for the caller to commit.
+    Returns: number of records created
+    """
+    if not image_ids:
+        return 0
+    existing = set(db.scalars(
+        select(Embedding.image_id).where(Embedding.image_id.in_(image_ids))
+    ))
+    rows = [
+        {"id": generate_uuid(), "image_id": image_id, "model_name": model_name}
+        for image_id in dict.fromkeys(image_ids)
+        if image_id not in existing
+    ]
+    if rows:
+        db.execute(insert(Embedding), rows)
+    if commit:
+        db.commit()
+    return len(rows)
+
+
 def get_images_without_embeddings(db: Session, project_id: str) -> List[Image]:
-    """Get images that don't have embeddings yet."""
-    return db.query(Image).filter(
+    """
+    Get images that don't have embeddings yet.
+    Explicit anti-join (embeddings.image_id is unique, so no row duplication).
+    """
+    return db.query(Image).outerjoin(
+        Embedding, Embedding.image_id == Image.id
+    ).filter(
         Image.project_id == project_id,
-        ~Image.embedding.has()
+        Embedding.id.is_(None)
     ).all()
@@ -1,29 +1,90 @@
 """
 Database connection and session management.
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
 from config import settings
 from db.models import Base
 
 
+# Server-side limit so a runaway query can't hold a pooled connection forever
+connect_args = {}
+if settings.DATABASE_URL.startswith("postgresql") and settings.DB_STATEMENT_TIMEOUT_MS:
+    connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,  # Log SQL queries in debug mode
-    pool_pre_ping=True,  # Verify connections before using
+    pool_pre_ping=settings.DB_PRE_PING,  # Verify connections before using
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_use_lifo=True,  # Reuse hot connections, let idle overflow ones close
+    connect_args=connect_args,
 )
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: objects returned by the crud helpers stay readable
+# after commit without a re-SELECT (all column defaults are Python-side)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+# Arbitrary key for the init_db advisory lock
+INIT_DB_LOCK_KEY = 7240119
+
+
+@contextmanager
+def _unbounded_connection():
+    """
+    engine.connect() without the DB_STATEMENT_TIMEOUT_MS limit, for init_db:
+    waiting on another worker's migrations and backfilling large tables can
+    legitimately take longer. The limit is restored before the connection
+    goes back to the pool.
+    """
+    with engine.connect() as conn:
+        postgres = engine.dialect.name == "postgresql"
+        if postgres:
+            conn.execute(text("SET statement_timeout = 0"))
+            conn.commit()
+        try:
+            yield conn
+        finally:
+            if postgres:
+                conn.rollback()
+                conn.execute(text("RESET statement_timeout"))
+                conn.commit()
 
 
 def init_db():
-    """Initialize database - create all tables and migrate enums."""
+    """
+    Initialize database - create all tables and migrate enums.
+    Serialized with a Postgres advisory lock so several API workers
+    starting at once don't race on CREATE TABLE / ALTER TYPE.
+    """
+    with _unbounded_connection() as lock_conn:
+        locked = False
+        try:
+            lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": INIT_DB_LOCK_KEY})
+            locked = True
+        except Exception as e:
+            lock_conn.rollback()
+            print(f"init_db lock unavailable, continuing without it: {e}")
+        try:
+            _init_db()
+        finally:
+            if locked:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": INIT_DB_LOCK_KEY})
+                lock_conn.commit()
+
+
+def _init_db():
+    """Create tables and apply migrations (see init_db)."""
     # Migrate enums for existing databases
     try:
-        with engine.connect() as conn:
+        with _unbounded_connection() as conn:
             # Add 'corrected' to imagestatus enum if it doesn't exist
             result = conn.execute(
                 __import__('sqlalchemy').text(
@@ -42,7 +103,76 @@ def init_db():
     except Exception as e:
         print(f"Enum migration skipped: {e}")
     
-    Base.metadata.create_all(bind=engine)
+    with _unbounded_connection() as conn:
+        Base.metadata.create_all(bind=conn)
+        conn.commit()
+    
+    # Add indexes/columns that create_all() won't add to existing tables
+    try:
+        with _unbounded_connection() as conn:
+            for statement in (
+                "CREATE INDEX IF NOT EXISTS ix_images_project_status ON images (project_id, status)",
+                # Covered by the composite index's leading column
+                "DROP INDEX IF EXISTS ix_images_project_id",
+                "CREATE INDEX IF NOT EXISTS ix_annotations_image_id ON annotations (image_id)",
+                "CREATE INDEX IF NOT EXISTS ix_classes_project_id ON classes (project_id)",
+            ):
+                conn.execute(text(statement))
+            conn.execute(
+                text(
+                    "ALTER TABLE projects ADD COLUMN IF NOT EXISTS "
+                    "annotations_version INTEGER NOT NULL DEFAULT 0"
+                )
+            )
+            conn.execute(text(
+                "ALTER TABLE projects ADD COLUMN IF NOT EXISTS "
+                "classes_version INTEGER NOT NULL DEFAULT 0"
+            ))
+            conn.commit()
+    except Exception as e:
+        print(f"Schema migration skipped: {e}")
+    
+    # Move JSON bbox values into the typed bbox_* columns
+    try:
+        with _unbounded_connection() as conn:
+            has_json_bbox = conn.execute(text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'annotations' AND column_name = 'bbox'"
+            )).fetchone()
+            if has_json_bbox:
+                for axis in ("x", "y", "w", "h"):
+                    conn.execute(text(
+                        f"ALTER TABLE annotations ADD COLUMN IF NOT EXISTS bbox_{axis} DOUBLE PRECISION"
+                    ))
+                conn.execute(text(
+                    "UPDATE annotations SET "
+                    "bbox_x = (bbox->>'x')::float, bbox_y = (bbox->>'y')::float, "
+                    "bbox_w = (bbox->>'w')::float, bbox_h = (bbox->>'h')::float"
+                ))
+                for axis in ("x", "y", "w", "h"):
+                    conn.execute(text(f"ALTER TABLE annotations ALTER COLUMN bbox_{axis} SET NOT NULL"))
+                conn.execute(text("ALTER TABLE annotations DROP COLUMN bbox"))
+                conn.commit()
+                print("Migrated annotations.bbox to bbox_x/bbox_y/bbox_w/bbox_h")
+    except Exception as e:
+        print(f"BBox migration skipped: {e}")
+    
+    # Annotation IDs moved from text UUIDs to BIGINT identity (nothing references them)
+    try:
+        with _unbounded_connection() as conn:
+            id_type = conn.execute(text(
+                "SELECT data_type FROM information_schema.columns "
+                "WHERE table_name = 'annotations' AND column_name = 'id'"
+            )).scalar()
+            if id_type == "character varying":
+                conn.execute(text("ALTER TABLE annotations DROP CONSTRAINT IF EXISTS annotations_pkey"))
+                conn.execute(text("ALTER TABLE annotations DROP COLUMN id"))
+                conn.execute(text("ALTER TABLE annotations ADD COLUMN id BIGSERIAL PRIMARY KEY"))
+                conn.commit()
+                print("Migrated annotations.id to BIGSERIAL")
+    except Exception as e:
+        print(f"Annotation ID migration skipped: {e}")
+    
     print("Database initialized!")
 
 
@@ -78,3 +208,14 @@ def get_db_session():
         raise
     finally:
         db.close()
+
+
+def relax_commit_durability(db: Session):
+    """
+    Let the current transaction's COMMIT return without waiting for the
+    WAL flush (SET LOCAL synchronous_commit = OFF; Postgres only, no-op
+    elsewhere). A crash can lose the last few such commits, but never
+    leaves them half-applied: use it only for writes a task can redo.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SET LOCAL synchronous_commit = OFF"))
@@ -2,11 +2,13 @@
 Database models using SQLAlchemy.
 Simple and straightforward schema.
 """
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, JSON, Enum as SQLEnum
+from sqlalchemy import BigInteger, Column, String, Integer, Float, ForeignKey, DateTime, Index, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
+import os
+import time
 import uuid
 
 
@@ -14,8 +16,15 @@ Base = declarative_base()
 
 
 def generate_uuid():
-    """Generate a UUID string."""
-    return str(uuid.uuid4())
+    """
+    Generate a time-ordered UUID string (UUIDv7 layout: 48-bit millisecond
+    timestamp, then random bits). New keys land at the right edge of the
+    primary key B-tree instead of at random pages.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return str(uuid.UUID(int=value))
 
 
 class ProjectStatus(str, enum.Enum):
@@ -45,6 +54,10 @@ class Project(Base):
     name = Column(String(255), nullable=False)
     description = Column(String, nullable=True)
     status = Column(SQLEnum(ProjectStatus), default=ProjectStatus.UPLOADING)
+    # Bumped whenever exported data (images, classes, annotations) changes
+    annotations_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped whenever the class list changes (invalidates cached class maps)
+    classes_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -70,6 +83,9 @@ class Image(Base):
     project = relationship("Project", back_populates="images")
     annotations = relationship("Annotation", back_populates="image", cascade="all, delete-orphan")
     embedding = relationship("Embedding", back_populates="image", uselist=False, cascade="all, delete-orphan")
+    
+    # Serves both "all images of a project" and "images of a project with status X"
+    __table_args__ = (Index("ix_images_project_status", "project_id", "status"),)
 
 
 class Class(Base):
@@ -77,7 +93,7 @@ class Class(Base):
     __tablename__ = "classes"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(100), nullable=False)
     color = Column(String(7), nullable=False)  # Hex color like #FF5733
     
@@ -90,12 +106,15 @@ class Annotation(Base):
     """Annotation table - stores bounding boxes."""
     __tablename__ = "annotations"
     
-    id = Column(String, primary_key=True, default=generate_uuid)
-    image_id = Column(String, ForeignKey("images.id", ondelete="CASCADE"), nullable=False)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    image_id = Column(String, ForeignKey("images.id", ondelete="CASCADE"), nullable=False, index=True)
     class_id = Column(Integer, ForeignKey("classes.id", ondelete="CASCADE"), nullable=False)
     
     # Bounding box in YOLO format: center_x, center_y, width, height (normalized 0-1)
-    bbox = Column(JSON, nullable=False)  # {"x": 0.5, "y": 0.5, "w": 0.2, "h": 0.3}
+    bbox_x = Column(Float, nullable=False)
+    bbox_y = Column(Float, nullable=False)
+    bbox_w = Column(Float, nullable=False)
+    bbox_h = Column(Float, nullable=False)
     
     confidence = Column(Float, nullable=True)  # Null for manual, score for auto
     source = Column(String(50), default="manual")  # "manual" or "auto"
@@ -104,6 +123,15 @@ class Annotation(Base):
     # Relationships
     image = relationship("Image", back_populates="annotations")
     class_obj = relationship("Class", back_populates="annotations")
+    
+    @property
+    def bbox(self) -> dict:
+        """Bounding box as {"x": 0.5, "y": 0.5, "w": 0.2, "h": 0.3}."""
+        return {"x": self.bbox_x, "y": self.bbox_y, "w": self.bbox_w, "h": self.bbox_h}
+    
+    @bbox.setter
+    def bbox(self, value: dict):
+        self.bbox_x, self.bbox_y, self.bbox_w, self.bbox_h = value["x"], value["y"], value["w"], value["h"]
 
 
 class Embedding(Base):
@@ -2,15 +2,34 @@
 Celery tasks for background processing.
 Handles long-running tasks like embedding generation, training, and auto-annotation.
 """
-from celery import Celery
+from celery import Celery, chord
+from celery.exceptions import Ignore
+from celery.signals import after_setup_logger, worker_process_init
 from config import settings
-from db.database import get_db_session
+from db.database import get_db_session, relax_commit_durability
 from db import crud
 from db.models import ProjectStatus, ImageStatus
-from core.embedding_generator import EmbeddingGenerator, FAISSVectorStore
+from core.embedding_generator import EmbeddingGenerator, FAISSVectorStore, vector_index_path
 from core.training import FewShotTrainer
 from core.auto_annotator import AutoAnnotator
+from tasks.tracking import (
+    release_inflight, training_key, auto_annotate_key, train_and_annotate_key,
+    embeddings_memo_key, get_memoized, set_memoized
+)
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, List, Optional, Tuple
+import atexit
+import hashlib
+import logging
+import numpy as np
+import os
+import queue
+
+
+logger = logging.getLogger(__name__)
 
 
 def resolve_image_path(file_path: str) -> str:
@@ -27,6 +46,70 @@ def resolve_image_path(file_path: str) -> str:
             return str(resolved)
     return file_path
 
+
+def _resolve_image_paths(project_id: str, file_paths: List[str], with_stats: bool):
+    """
+    Shared body of resolve_image_paths and resolve_image_paths_with_stats.
+    Returns: (resolved paths, (mtime_ns, size) per path or None if missing;
+    an empty list unless with_stats)
+    """
+    images_dir = str(Path(settings.DATA_DIR) / "projects" / project_id / "images")
+    present = {}
+    try:
+        with os.scandir(images_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    if with_stats:
+                        stat = entry.stat()
+                        present[entry.name] = (stat.st_mtime_ns, stat.st_size)
+                    else:
+                        present[entry.name] = None
+    except OSError:
+        pass
+    
+    resolved = []
+    stats = []
+    for file_path in file_paths:
+        parts = file_path.replace('\\', '/')
+        _, sep, rel = parts.partition('projects/')
+        candidates = (parts, str(Path(settings.DATA_DIR) / "projects" / rel) if sep else None)
+        for candidate in candidates:
+            if candidate and os.path.dirname(candidate) == images_dir and os.path.basename(candidate) in present:
+                resolved.append(candidate)
+                if with_stats:
+                    stats.append(present[os.path.basename(candidate)])
+                break
+        else:
+            path = resolve_image_path(file_path)
+            resolved.append(path)
+            if with_stats:
+                try:
+                    stat = os.stat(path)
+                    stats.append((stat.st_mtime_ns, stat.st_size))
+                except OSError:
+                    stats.append(None)
+    return resolved, stats
+
+
+def resolve_image_paths(project_id: str, file_paths: List[str]) -> List[str]:
+    """
+    resolve_image_path for a whole project: the images directory is listed
+    once, so paths inside it resolve without a stat() each. Anything else
+    falls back to resolve_image_path.
+    """
+    return _resolve_image_paths(project_id, file_paths, with_stats=False)[0]
+
+
+def resolve_image_paths_with_stats(
+    project_id: str, file_paths: List[str]
+) -> Tuple[List[str], List[Optional[Tuple[int, int]]]]:
+    """
+    resolve_image_paths, plus each file's (mtime_ns, size) from the same
+    directory listing (None for a missing file).
+    """
+    return _resolve_image_paths(project_id, file_paths, with_stats=True)
+
+
 # Initialize Celery
 celery_app = Celery(
     "auto_annotation",
@@ -40,13 +123,90 @@ celery_app.conf.update(
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
+    task_track_started=True,  # Report STARTED so PENDING only means "queued"
+    worker_prefetch_multiplier=1,  # Long tasks: don't reserve work another worker could start
 )
 
 
+_log_listener = None  # Background thread writing queued log records
+
+
+@after_setup_logger.connect
+def queue_log_output(**kwargs):
+    """
+    Route the worker's log output through a queue: tasks only enqueue
+    records, and a listener thread does the blocking stream writes.
+    """
+    global _log_listener
+    root = kwargs["logger"]
+    handlers = [h for h in root.handlers if not isinstance(h, QueueHandler)]
+    if not handlers:
+        return
+    log_queue = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    _log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(lambda: _log_listener.stop())
+
+
+@worker_process_init.connect
+def restart_log_listener(**kwargs):
+    """Threads don't survive the prefork pool's fork: give each child its own listener."""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener = QueueListener(_log_listener.queue, *_log_listener.handlers, respect_handler_level=True)
+        _log_listener.start()
+
+
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+
+
+@worker_process_init.connect
+def preload_models(**kwargs):
+    """Warm the process-wide CLIP model cache in each worker (opt-in)."""
+    if settings.PRELOAD_EMBEDDING_MODEL:
+        EmbeddingGenerator(CLIP_MODEL_NAME)
+
+
+def _report_progress(task, current: int, total: int, task_id: Optional[str] = None):
+    """
+    Store a PROGRESS state; the result backend publishes it to /task/{id}/stream subscribers.
+    task_id reports under another id instead (a chain's tracked task).
+    """
+    if not task.request.called_directly:
+        task.update_state(task_id=task_id, state="PROGRESS", meta={"current": current, "total": total})
+
+
+def _files_fingerprint(image_ids: List[str], file_stats: List[Optional[Tuple[int, int]]]) -> str:
+    """
+    Hash of every (image id, file mtime, file size): changes when any image
+    is added, removed or replaced. file_stats come from resolve_image_paths_with_stats.
+    """
+    digest = hashlib.sha1()
+    for image_id, stat in zip(image_ids, file_stats):
+        if stat is None:
+            digest.update(f"{image_id}:missing,".encode())
+        else:
+            digest.update(f"{image_id}:{stat[0]}:{stat[1]},".encode())
+    return digest.hexdigest()
+
+
+def _index_mtime(project_id: str) -> Optional[int]:
+    """mtime of the project's FAISS index file (None if there is none)."""
+    try:
+        return vector_index_path(project_id).stat().st_mtime_ns
+    except OSError:
+        return None
+
+
 @celery_app.task(bind=True)
-def generate_embeddings_task(self, project_id: str, model_name: str = "openai/clip-vit-base-patch32"):
+def generate_embeddings_task(self, project_id: str, model_name: str = CLIP_MODEL_NAME):
     """
     Background task to generate embeddings for all images in a project.
+    A rerun within MEMO_KEY_TTL with the same image files, while the index
+    it wrote is still in place, returns the earlier result without embedding.
     """
     try:
         # Update project status
@@ -54,84 +214,94 @@ def generate_embeddings_task(self, project_id: str, model_name: str = "openai/cl
             crud.update_project_status(db, project_id, ProjectStatus.EMBEDDING)
             
             # Get all images
-            images = crud.get_project_images(db, project_id)
+            images = crud.get_project_images_lite(db, project_id)
             
             if not images:
                 return {"status": "error", "message": "No images found"}
             
+            image_paths, file_stats = resolve_image_paths_with_stats(project_id, [img["file_path"] for img in images])
+            image_ids = [img["id"] for img in images]
+            
+            # Same files embedded recently by this model, and the index untouched since?
+            memo_key = embeddings_memo_key(project_id, model_name, _files_fingerprint(image_ids, file_stats))
+            memo = get_memoized(memo_key)
+            if memo is not None and memo["index_mtime"] == _index_mtime(project_id):
+                logger.info("Embeddings for %d images unchanged, reusing the last run", len(images))
+                crud.update_project_status(db, project_id, ProjectStatus.ANNOTATING)
+                return memo["result"]
+            
             # Initialize generator
             generator = EmbeddingGenerator(model_name)
             vector_store = FAISSVectorStore(project_id, generator.embedding_dim)
             
             # Generate embeddings
-            image_paths = [resolve_image_path(img.file_path) for img in images]
-            image_ids = [img.id for img in images]
+            logger.info("Generating embeddings for %d images", len(images))
             
-            print(f"Generating embeddings for {len(images)} images...")
-            embeddings = generator.generate_batch_embeddings(image_paths, batch_size=32)
-            
-            # Add to FAISS
-            vector_store.add_embeddings(embeddings, image_ids)
+            # Add to FAISS batch by batch as the generator yields them
+            num_embeddings = 0
+            for embeddings in generator.iter_batch_embeddings(image_paths):
+                vector_store.add_embeddings(embeddings, image_ids[num_embeddings:num_embeddings + len(embeddings)])
+                num_embeddings += len(embeddings)
+                _report_progress(self, num_embeddings, len(images))
             vector_store.save_index()
             
-            # Create embedding records in DB
-            for img_id in image_ids:
-                crud.create_embedding_record(db, img_id, model_name)
+            # Create embedding records in DB (one bulk INSERT), committed with the status
+            relax_commit_durability(db)
+            crud.create_embedding_records_bulk(db, image_ids, model_name, commit=False)
             
             # Update project status
             crud.update_project_status(db, project_id, ProjectStatus.ANNOTATING)
             
-            return {
+            result = {
                 "status": "success",
-                "message": f"Generated {len(embeddings)} embeddings",
-                "num_embeddings": len(embeddings)
+                "message": f"Generated {num_embeddings} embeddings",
+                "num_embeddings": num_embeddings
             }
+            set_memoized(memo_key, {"result": result, "index_mtime": _index_mtime(project_id)})
+            return result
     
     except Exception as e:
-        print(f"Error generating embeddings: {e}")
+        logger.exception("Error generating embeddings: %s", e)
         return {"status": "error", "message": str(e)}
 
 
 @celery_app.task(bind=True)
-def train_model_task(self, project_id: str, epochs: int = 50, batch_size: int = 16):
+def train_model_task(
+    self,
+    project_id: str,
+    epochs: int = 50,
+    batch_size: int = 16,
+    progress_task_id: Optional[str] = None
+):
     """
     Background task to train object detection model.
+    progress_task_id also receives the epoch progress (the id a chain is tracked by).
     """
+    def report(epoch: int, total: int):
+        _report_progress(self, epoch, total)
+        if progress_task_id:
+            _report_progress(self, epoch, total, task_id=progress_task_id)
+    
     try:
+        if progress_task_id:
+            # Show the tracked task as running while training
+            _report_progress(self, 0, epochs, task_id=progress_task_id)
         with get_db_session() as db:
             # Update project status
             crud.update_project_status(db, project_id, ProjectStatus.TRAINING)
             
             # Get annotated images
-            images = crud.get_project_images(db, project_id, status=ImageStatus.ANNOTATED)
+            images = crud.get_project_images_lite(db, project_id, status=ImageStatus.ANNOTATED)
             
             if len(images) < 5:
                 return {"status": "error", "message": "Need at least 5 annotated images to train"}
             
-            # Get annotations
-            all_annotations = []
-            for img in images:
-                anns = crud.get_image_annotations(db, img.id)
-                for ann in anns:
-                    all_annotations.append({
-                        "image_id": ann.image_id,
-                        "class_id": ann.class_id,
-                        "bbox": ann.bbox
-                    })
+            # Get annotations (one JOIN query for all annotated images)
+            all_annotations = crud.get_project_annotations(db, project_id, status=ImageStatus.ANNOTATED)
             
             # Get classes
             classes = crud.get_project_classes(db, project_id)
             
-            # Convert to dict format
-            images_dict = [
-                {
-                    "id": img.id,
-                    "filename": img.filename,
-                    "file_path": img.file_path
-                }
-                for img in images
-            ]
-            
             classes_dict = [
                 {"id": cls.id, "name": cls.name}
                 for cls in classes
@@ -139,11 +309,12 @@ def train_model_task(self, project_id: str, epochs: int = 50, batch_size: int =
             
             # Train
             trainer = FewShotTrainer(project_id)
-            data_yaml = trainer.prepare_yolo_dataset(images_dict, all_annotations, classes_dict)
+            data_yaml = trainer.prepare_yolo_dataset(images, all_annotations, classes_dict)
             model_path = trainer.train(
                 data_yaml,
                 epochs=epochs,
-                batch_size=batch_size
+                batch_size=batch_size,
+                on_epoch_end=report
             )
             
             # Update project status
@@ -157,69 +328,179 @@ def train_model_task(self, project_id: str, epochs: int = 50, batch_size: int =
             }
     
     except Exception as e:
-        print(f"Error training model: {e}")
+        logger.exception("Error training model: %s", e)
         return {"status": "error", "message": str(e)}
+    
+    finally:
+        # Let the next start request enqueue a new run
+        release_inflight(training_key(project_id, epochs, batch_size), self.request.id)
+
+
+ANNOTATION_WRITE_BATCH = 64  # Images per bulk annotation insert
+ANNOTATION_WRITE_QUEUE_SIZE = 4  # Batches buffered between inference and the writer
+
+
+def _write_auto_annotations(batches: queue.Queue) -> int:
+    """
+    Consume (image_ids, annotation rows) batches until None: insert the rows
+    and mark those images auto-annotated. Returns the number of annotations.
+    """
+    total = 0
+    with get_db_session() as db:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return total
+            image_ids, rows = batch
+            # One transaction per batch; results are recomputable, so don't wait on fsync
+            relax_commit_durability(db)
+            crud.create_annotation_rows_bulk(db, rows, commit=False)
+            crud.update_images_status(db, image_ids, ImageStatus.AUTO_ANNOTATED)
+            total += len(rows)
+
+
+def _put_checked(batches: queue.Queue, item, writer: Future):
+    """Queue item for the writer, re-raising its error if it died (instead of blocking forever)."""
+    while True:
+        if writer.done():
+            writer.result()  # Raises the writer's error
+            return
+        try:
+            batches.put(item, timeout=1)
+            return
+        except queue.Full:
+            pass
+
+
+@lru_cache(maxsize=128)
+def _class_index_map(project_id: str, classes_version: int) -> dict:
+    """
+    Model class idx -> DB class id for a project, cached per worker process.
+    classes_version is part of the key, so a class edit misses the cache.
+    The returned dict is shared: don't modify it.
+    """
+    with get_db_session() as db:
+        return {idx: cls.id for idx, cls in enumerate(crud.get_project_classes(db, project_id))}
+
+
+def _annotate_and_store(
+    db, project_id: str, images: list, model_path: str, confidence_threshold: float,
+    on_progress: Optional[Callable[[int, int], None]] = None
+) -> int:
+    """
+    Run the model over images and store the results: a second thread (own
+    session) writes each batch while inference continues, and the bounded
+    queue caps buffered results. on_progress(done, total) is called after
+    each batch. Returns the number of annotations created.
+    """
+    # Get class mapping (model class idx to DB class id) as a lookup array
+    class_idx_to_id = _class_index_map(project_id, crud.get_classes_version(db, project_id))
+    num_classes = len(class_idx_to_id)
+    class_lut = np.array([class_idx_to_id[idx] for idx in range(num_classes)], dtype=np.int64)
+    
+    annotator = AutoAnnotator(model_path)
+    image_ids = [img["id"] for img in images]
+    image_paths = resolve_image_paths(project_id, [img["file_path"] for img in images])
+    logger.info("Auto-annotating %d images", len(images))
+    
+    batches = queue.Queue(maxsize=ANNOTATION_WRITE_QUEUE_SIZE)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        writer = pool.submit(_write_auto_annotations, batches)
+        try:
+            batch_ids, batch_rows = [], []
+            done = 0
+            results = annotator.iter_detections(image_paths, confidence_threshold)
+            for img_id, (_, (xywhn, class_ids, confidences)) in zip(image_ids, results):
+                # Drop classes the model knows but the project doesn't, map the rest
+                keep = class_ids < num_classes
+                if keep.any():
+                    batch_rows.extend(
+                        {
+                            "image_id": img_id,
+                            "class_id": class_id,
+                            "bbox_x": x, "bbox_y": y, "bbox_w": w, "bbox_h": h,
+                            "confidence": conf,
+                            "source": "auto"
+                        }
+                        for class_id, (x, y, w, h), conf in zip(
+                            class_lut[class_ids[keep]].tolist(),
+                            xywhn[keep].tolist(),
+                            confidences[keep].tolist()
+                        )
+                    )
+                batch_ids.append(img_id)
+                
+                if len(batch_ids) >= ANNOTATION_WRITE_BATCH:
+                    _put_checked(batches, (batch_ids, batch_rows), writer)
+                    done += len(batch_ids)
+                    batch_ids, batch_rows = [], []
+                    if on_progress:
+                        on_progress(done, len(images))
+            
+            if batch_ids:
+                _put_checked(batches, (batch_ids, batch_rows), writer)
+        finally:
+            _put_checked(batches, None, writer)  # Tell the writer to stop
+        total_annotations = writer.result()
+    
+    logger.info("Auto-annotation completed")
+    return total_annotations
 
 
 @celery_app.task(bind=True)
-def auto_annotate_task(self, project_id: str, confidence_threshold: float = 0.25):
+def auto_annotate_task(
+    self,
+    project_id: str,
+    confidence_threshold: float = 0.25,
+    model_path: str = None,
+    inflight_key: Optional[str] = None
+):
     """
     Background task to auto-annotate remaining images.
+    Uses model_path if given, otherwise the project's latest trained model.
+    With AUTO_ANNOTATE_SHARD_SIZE set, larger projects are replaced by a
+    chord of annotate_shard_task (one per shard, spread over workers) and
+    finish_auto_annotate_task, which keeps this task's id.
+    inflight_key is the coalescing key released when done (default: auto_annotate_key).
     """
+    inflight_key = inflight_key or auto_annotate_key(project_id, confidence_threshold)
+    sharded = False
     try:
         with get_db_session() as db:
             # Update project status
             crud.update_project_status(db, project_id, ProjectStatus.AUTO_ANNOTATING)
             
             # Get trained model
-            trainer = FewShotTrainer(project_id)
-            model_path = trainer.get_latest_model()
+            if not model_path:
+                trainer = FewShotTrainer(project_id)
+                model_path = trainer.get_latest_model()
             
             if not model_path:
                 return {"status": "error", "message": "No trained model found"}
             
             # Get unannotated images
-            images = crud.get_project_images(db, project_id, status=ImageStatus.UNANNOTATED)
+            images = crud.get_project_images_lite(db, project_id, status=ImageStatus.UNANNOTATED)
             
             if not images:
                 return {"status": "success", "message": "No images to annotate"}
             
-            # Auto-annotate
-            annotator = AutoAnnotator(model_path)
-            # Build resolved path mapping
-            resolved_paths = {img.id: resolve_image_path(img.file_path) for img in images}
-            image_paths = list(resolved_paths.values())
-            
-            results = annotator.annotate_batch(image_paths, confidence_threshold)
+            shard_size = settings.AUTO_ANNOTATE_SHARD_SIZE
+            if shard_size and len(images) > shard_size and not self.request.called_directly:
+                image_ids = [img["id"] for img in images]
+                shards = [image_ids[i:i + shard_size] for i in range(0, len(image_ids), shard_size)]
+                logger.info("Auto-annotating %d images in %d shards", len(images), len(shards))
+                sharded = True
+                # Raises Ignore (returns the result when eager); the chord
+                # body finishes under this task's id
+                return self.replace(chord(
+                    [annotate_shard_task.s(project_id, shard, model_path, confidence_threshold) for shard in shards],
+                    finish_auto_annotate_task.s(project_id, confidence_threshold, inflight_key)
+                ))
             
-            # Get class mapping (model class idx to DB class id)
-            classes = crud.get_project_classes(db, project_id)
-            class_idx_to_id = {idx: cls.id for idx, cls in enumerate(classes)}
-            
-            # Save annotations
-            total_annotations = 0
-            for img in images:
-                resolved = resolved_paths[img.id]
-                annotations = results.get(resolved, [])
-                
-                for ann in annotations:
-                    # Map model class idx to DB class id
-                    model_class_idx = ann["class_id"]
-                    if model_class_idx < len(classes):
-                        class_id = class_idx_to_id[model_class_idx]
-                        
-                        crud.create_annotation(
-                            db,
-                            image_id=img.id,
-                            class_id=class_id,
-                            bbox=ann["bbox"],
-                            confidence=ann["confidence"],
-                            source="auto"
-                        )
-                        total_annotations += 1
-                
-                # Update image status
-                crud.update_image_status(db, img.id, ImageStatus.AUTO_ANNOTATED)
+            total_annotations = _annotate_and_store(
+                db, project_id, images, model_path, confidence_threshold,
+                on_progress=lambda done, total: _report_progress(self, done, total)
+            )
             
             # Update project status
             crud.update_project_status(db, project_id, ProjectStatus.COMPLETED)
@@ -231,6 +512,106 @@ def auto_annotate_task(self, project_id: str, confidence_threshold: float = 0.25
                 "total_annotations": total_annotations
             }
     
+    except Ignore:
+        raise
+    
     except Exception as e:
-        print(f"Error auto-annotating: {e}")
+        logger.exception("Error auto-annotating: %s", e)
         return {"status": "error", "message": str(e)}
+    
+    finally:
+        # A sharded run's key is released by finish_auto_annotate_task
+        if not sharded:
+            release_inflight(inflight_key, self.request.id)
+
+
+@celery_app.task(bind=True)
+def annotate_shard_task(self, project_id: str, image_ids: List[str], model_path: str, confidence_threshold: float = 0.25):
+    """
+    One shard of a sharded auto_annotate_task: annotate and store these images.
+    Errors are returned rather than raised: a failed shard would skip the
+    chord body, leaving the project in AUTO_ANNOTATING.
+    """
+    try:
+        with get_db_session() as db:
+            images = crud.get_images_lite(db, image_ids)
+            total_annotations = _annotate_and_store(db, project_id, images, model_path, confidence_threshold)
+        return {"status": "success", "num_images": len(images), "total_annotations": total_annotations}
+    
+    except Exception as e:
+        logger.exception("Error auto-annotating shard: %s", e)
+        return {"status": "error", "message": str(e), "num_images": 0, "total_annotations": 0}
+
+
+@celery_app.task(bind=True)
+def finish_auto_annotate_task(
+    self,
+    shard_results: List[dict],
+    project_id: str,
+    confidence_threshold: float = 0.25,
+    inflight_key: Optional[str] = None
+):
+    """
+    Chord body of a sharded auto_annotate_task (runs under that task's id,
+    so status polling sees one task). Shards have already stored their results.
+    """
+    try:
+        num_images = sum(r["num_images"] for r in shard_results)
+        total_annotations = sum(r["total_annotations"] for r in shard_results)
+        failed = [r for r in shard_results if r["status"] == "error"]
+        
+        with get_db_session() as db:
+            # A failed shard's images are still unannotated: leave the project
+            # open for annotation so a rerun picks them up
+            status = ProjectStatus.ANNOTATING if failed else ProjectStatus.COMPLETED
+            crud.update_project_status(db, project_id, status)
+        
+        if failed:
+            return {
+                "status": "error",
+                "message": f"{len(failed)} of {len(shard_results)} shards failed: {failed[0]['message']}",
+                "num_images": num_images,
+                "total_annotations": total_annotations
+            }
+        
+        return {
+            "status": "success",
+            "message": f"Auto-annotated {num_images} images",
+            "num_images": num_images,
+            "total_annotations": total_annotations
+        }
+    
+    finally:
+        release_inflight(inflight_key or auto_annotate_key(project_id, confidence_threshold), self.request.id)
+
+
+@celery_app.task(bind=True)
+def annotate_after_training_task(
+    self,
+    train_result: dict,
+    project_id: str,
+    epochs: int = 50,
+    batch_size: int = 16,
+    confidence_threshold: float = 0.25
+):
+    """
+    Second link of the train -> auto-annotate chain, enqueued under the id
+    the API returns. Receives train_model_task's result and replaces itself
+    with auto_annotate_task on the model it produced, so annotation runs as
+    a real task under the same id (progress, sharding) and releases the key.
+    """
+    key = train_and_annotate_key(project_id, epochs, batch_size, confidence_threshold)
+    if not isinstance(train_result, dict) or train_result.get("status") != "success":
+        release_inflight(key, self.request.id)
+        return train_result
+    try:
+        # Raises Ignore (returns the result when eager)
+        return self.replace(auto_annotate_task.s(
+            project_id, confidence_threshold,
+            model_path=train_result.get("model_path"), inflight_key=key
+        ))
+    except Ignore:
+        raise
+    except Exception:
+        release_inflight(key, self.request.id)
+        raise
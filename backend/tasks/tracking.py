@@ -0,0 +1,108 @@
+"""
+Lightweight task registry in Redis.
+Lets the API answer "does this task exist?" without broadcasting to workers,
+and coalesces duplicate start requests onto the task already in flight.
+"""
+import json
+import time
+from typing import Optional
+import redis
+import redis.asyncio
+from config import settings
+
+
+# How long a registered task_id is remembered (seconds). Only consulted while
+# the task is PENDING, so it has to outlast the longest queue wait: a chain's
+# last task stays PENDING for the whole run before it (at most INFLIGHT_KEY_TTL).
+TASK_KEY_TTL = 24 * 3600
+
+redis_client = redis.Redis.from_url(settings.REDIS_URL)
+# For pub/sub subscriptions held open inside async handlers
+async_redis_client = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+
+
+def _task_key(task_id: str) -> str:
+    return f"task:{task_id}"
+
+
+def register_task(task_id: str, project_id: str):
+    """Record a task the API just enqueued."""
+    redis_client.set(
+        _task_key(task_id),
+        json.dumps({"task_id": task_id, "project_id": project_id, "created_at": time.time()}),
+        ex=TASK_KEY_TTL
+    )
+
+
+def task_exists(task_id: str) -> bool:
+    """Check whether a task_id was enqueued by the API recently."""
+    return bool(redis_client.exists(_task_key(task_id)))
+
+
+# ==================== In-flight Coalescing ====================
+
+# How long a start request stays coalesced onto its in-flight task (seconds)
+INFLIGHT_KEY_TTL = 6 * 3600
+# How long a claim lasts before its task_id is attached (seconds): short, so an
+# API process dying between claim_inflight and set_inflight doesn't block the key
+INFLIGHT_CLAIM_TTL = 30
+
+
+def training_key(project_id: str, epochs: int, batch_size: int) -> str:
+    return f"inflight:training:{project_id}:{epochs}:{batch_size}"
+
+
+def auto_annotate_key(project_id: str, confidence_threshold: float) -> str:
+    return f"inflight:auto-annotate:{project_id}:{confidence_threshold}"
+
+
+def train_and_annotate_key(project_id: str, epochs: int, batch_size: int, confidence_threshold: float) -> str:
+    return f"inflight:train-and-annotate:{project_id}:{epochs}:{batch_size}:{confidence_threshold}"
+
+
+def claim_inflight(key: str) -> Optional[str]:
+    """
+    Claim an in-flight key before enqueueing a task.
+    Returns None if the caller now owns the key, otherwise the task_id
+    already holding it ("" while that task is still being enqueued).
+    """
+    while True:
+        if redis_client.set(key, "", nx=True, ex=INFLIGHT_CLAIM_TTL):
+            return None
+        existing = redis_client.get(key)
+        if existing is not None:
+            return existing.decode()
+        # Expired between the two calls: try to claim again
+
+
+def set_inflight(key: str, task_id: str):
+    """Attach the enqueued task_id to a claimed key and extend it to INFLIGHT_KEY_TTL."""
+    redis_client.set(key, task_id, xx=True, ex=INFLIGHT_KEY_TTL)
+
+
+def release_inflight(key: str, task_id: str = ""):
+    """Release a key, only if it still belongs to task_id."""
+    existing = redis_client.get(key)
+    if existing is not None and existing.decode() == task_id:
+        redis_client.delete(key)
+
+
+# ==================== Result Memoization ====================
+
+# How long a finished task's result can stand in for re-running it (seconds)
+MEMO_KEY_TTL = 24 * 3600
+
+
+def embeddings_memo_key(project_id: str, model_name: str, fingerprint: str) -> str:
+    return f"memo:embeddings:{project_id}:{model_name}:{fingerprint}"
+
+
+def get_memoized(key: str) -> Optional[dict]:
+    """Get a result stored by set_memoized (None if missing or expired)."""
+    value = redis_client.get(key)
+    return json.loads(value) if value is not None else None
+
+
+def set_memoized(key: str, value: dict):
+    """Remember a finished task's result under key for MEMO_KEY_TTL."""
+    redis_client.set(key, json.dumps(value), ex=MEMO_KEY_TTL)
@@ -109,12 +109,30 @@ const API = {
     startAutoAnnotation(projectId, confidenceThreshold = 0.25) {
         return this._fetch(`/training/${projectId}/auto-annotate?confidence_threshold=${confidenceThreshold}`, { method: 'POST' });
     },
+    startTrainAndAnnotate(projectId, epochs = 50, batchSize = 16, confidenceThreshold = 0.25) {
+        return this._fetch(`/training/${projectId}/train-and-annotate?epochs=${epochs}&batch_size=${batchSize}&confidence_threshold=${confidenceThreshold}`, { method: 'POST' });
+    },
     getTrainingLogs(projectId, lastEpoch = 0) {
         return this._fetch(`/training/${projectId}/logs?last_epoch=${lastEpoch}`);
     },
     getTaskStatus(taskId) {
         return this._fetch(`/training/task/${taskId}`);
     },
+    // Push-based alternative to polling getTaskStatus; returns the EventSource.
+    // onError runs once if the stream fails, so the caller can fall back to polling.
+    streamTaskStatus(taskId, onUpdate, onError) {
+        const source = new EventSource(`${this.BASE}/training/task/${taskId}/stream`);
+        source.onmessage = (e) => {
+            const status = JSON.parse(e.data);
+            if (!['pending', 'running'].includes(status.status)) source.close();
+            onUpdate(status);
+        };
+        source.onerror = () => {
+            source.close();
+            if (onError) onError();
+        };
+        return source;
+    },
     cancelTask(taskId) {
         return this._fetch(`/training/task/${taskId}`, { method: 'DELETE' });
     },
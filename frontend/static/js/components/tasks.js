@@ -7,7 +7,7 @@ const TaskTracker = {
 
     add(name, taskId) {
         this.tasks[name] = { id: taskId, status: 'pending' };
-        this._startPolling(name);
+        this._startStream(name);
         this.render();
     },
 
@@ -31,36 +31,62 @@ const TaskTracker = {
         this.render();
     },
 
+    // Status updates are pushed over SSE; polling is only the fallback
+    _startStream(name) {
+        this._stopPolling(name);
+        const task = this.tasks[name];
+        if (!window.EventSource) { this._startPolling(name); return; }
+        task._source = API.streamTaskStatus(
+            task.id,
+            (status) => this._update(name, status),
+            () => { if (this.tasks[name] === task) this._startPolling(name); }
+        );
+    },
+
     _startPolling(name) {
         this._stopPolling(name);
         const interval = setInterval(async () => {
             const task = this.tasks[name];
             if (!task) { clearInterval(interval); return; }
             try {
-                const status = await API.getTaskStatus(task.id);
-                task.status = status.status;
-                task.result = status.result;
-                this.render();
-
-                if (status.status === 'completed' || status.status === 'failed') {
-                    this._stopPolling(name);
-                    if (status.status === 'completed') {
-                        showToast(`${name} completed`, 'success');
-                    } else {
-                        showToast(`${name} failed`, 'error');
-                    }
-                }
+                this._update(name, await API.getTaskStatus(task.id));
             } catch (e) { /* ignore */ }
         }, this.pollMs);
         this.tasks[name]._interval = interval;
     },
 
+    _update(name, status) {
+        const task = this.tasks[name];
+        if (!task) return;
+        task.status = status.status;
+        task.result = status.result;
+        task.progress = status.progress;
+        task.total = status.total;
+        this.render();
+
+        // Anything but pending/running is final ("unknown": the server lost track of it)
+        if (!['pending', 'running'].includes(status.status)) {
+            this._stopPolling(name);
+            if (status.status === 'completed') {
+                showToast(`${name} completed`, 'success');
+            } else if (status.status === 'failed') {
+                showToast(`${name} failed`, 'error');
+            } else {
+                showToast(`${name}: status ${status.status}`, 'info');
+            }
+        }
+    },
+
     _stopPolling(name) {
         const task = this.tasks[name];
         if (task && task._interval) {
             clearInterval(task._interval);
             delete task._interval;
         }
+        if (task && task._source) {
+            task._source.close();
+            delete task._source;
+        }
     },
 
     render() {
@@ -79,16 +105,19 @@ const TaskTracker = {
             const statusClass = t.status === 'completed' ? 'completed'
                 : t.status === 'failed' ? 'failed'
                     : t.status === 'running' ? 'running' : 'pending';
+            const finished = !['pending', 'running'].includes(t.status);
             const icon = t.status === 'completed' ? '[done]'
                 : t.status === 'failed' ? '[fail]'
-                    : '<span class="task-spinner"></span>';
-            const cancelBtn = (t.status !== 'completed' && t.status !== 'failed')
+                    : finished ? '[?]' : '<span class="task-spinner"></span>';
+            const percent = (t.status === 'running' && t.progress && t.total)
+                ? ` ${Math.round(100 * t.progress / t.total)}%` : '';
+            const cancelBtn = !finished
                 ? `<button class="task-cancel" onclick="TaskTracker.cancel('${name}')" title="Cancel">x</button>`
                 : `<button class="task-cancel" onclick="TaskTracker.remove('${name}')" title="Dismiss">x</button>`;
 
             return `<div class="task-item ${statusClass}">
                 ${icon}
-                <span class="task-name">${name}</span>
+                <span class="task-name">${name}${percent}</span>
                 ${cancelBtn}
             </div>`;
         }).join('');
@@ -54,7 +54,10 @@ function renderTrainPage() {
                 <input type="range" min="0" max="1" step="0.05" value="0.25" id="conf-slider"
                     oninput="document.getElementById('conf-value').textContent=parseFloat(this.value).toFixed(2)">
             </div>
-            <button class="btn btn-primary" onclick="startAutoAnnotation()">Auto-Annotate Remaining</button>
+            <div class="flex gap-8">
+                <button class="btn btn-primary" onclick="startAutoAnnotation()">Auto-Annotate Remaining</button>
+                <button class="btn" onclick="startTrainAndAnnotate()">Train, then Auto-Annotate</button>
+            </div>
         </div>
 
         <!-- Training Logs -->
@@ -152,6 +155,7 @@ async function loadReadiness() {
 
 
 let trainingLogInterval = null;
+let trainingStatusStream = null;
 
 async function startTraining() {
     const epochs = parseInt(document.getElementById('epochs-slider').value);
@@ -174,88 +178,145 @@ async function startTraining() {
     }
 }
 
-function startLogPolling(taskId) {
+async function startTrainAndAnnotate() {
+    const epochs = parseInt(document.getElementById('epochs-slider').value);
+    const batchSize = parseInt(document.getElementById('batch-slider').value);
+    const conf = parseFloat(document.getElementById('conf-slider').value);
+    const logsEl = document.getElementById('training-logs');
+
+    try {
+        // One task id covers both stages: epoch progress, then annotated images
+        const result = await API.startTrainAndAnnotate(AppState.projectId, epochs, batchSize, conf);
+        TaskTracker.add('Training + Auto-Annotation', result.task_id);
+        showToast('Training and auto-annotation started', 'info');
+
+        logsEl.innerHTML = `<span class="terminal-muted">Training starting, then auto-annotation (confidence: ${conf})...</span>\n`;
+        const tbody = document.getElementById('metrics-tbody');
+        if (tbody) tbody.innerHTML = '';
+
+        startLogPolling(result.task_id, 'Training + auto-annotation');
+    } catch (e) {
+        showToast(`Error: ${e.message}`, 'error');
+    }
+}
+
+function stopLogPolling() {
     if (trainingLogInterval) clearInterval(trainingLogInterval);
+    if (trainingStatusStream) trainingStatusStream.close();
+    trainingLogInterval = null;
+    trainingStatusStream = null;
+}
+
+function startLogPolling(taskId, label = 'Training') {
+    stopLogPolling();
     const logsEl = document.getElementById('training-logs');
     let lastEpoch = 0;
     let allEpochs = [];
 
-    trainingLogInterval = setInterval(async () => {
-        try {
-            // Fetch new epoch metrics
-            const logData = await API.getTrainingLogs(AppState.projectId, lastEpoch);
+    async function fetchLogs() {
+        // Fetch new epoch metrics
+        const logData = await API.getTrainingLogs(AppState.projectId, lastEpoch);
 
-            // Update status message
-            if (logData.status) {
-                const statusEl = document.getElementById('training-status');
-                if (statusEl) statusEl.textContent = logData.status;
-            }
+        // Update status message
+        if (logData.status) {
+            const statusEl = document.getElementById('training-status');
+            if (statusEl) statusEl.textContent = logData.status;
+        }
 
-            // Add new epochs to table
-            if (logData.epochs && logData.epochs.length > 0) {
-                const section = document.getElementById('metrics-table-section');
-                section.style.display = 'block';
-                const tbody = document.getElementById('metrics-tbody');
-
-                for (const ep of logData.epochs) {
-                    allEpochs.push(ep);
-                    lastEpoch = ep.epoch;
-
-                    // Add row to table
-                    const row = document.createElement('tr');
-                    row.innerHTML = `
-                        <td><strong>${ep.epoch}</strong></td>
-                        <td>${ep.box_loss}</td>
-                        <td>${ep.cls_loss}</td>
-                        <td>${ep.dfl_loss}</td>
-                        <td class="${ep.precision > 0.5 ? 'metric-good' : ''}">${ep.precision}</td>
-                        <td class="${ep.recall > 0.5 ? 'metric-good' : ''}">${ep.recall}</td>
-                        <td class="${ep.mAP50 > 0.5 ? 'metric-good' : ''}">${ep.mAP50}</td>
-                        <td class="${ep.mAP50_95 > 0.3 ? 'metric-good' : ''}">${ep.mAP50_95}</td>
-                        <td>${ep.val_box_loss}</td>
-                        <td>${ep.val_cls_loss}</td>
-                        <td>${ep.val_dfl_loss}</td>
-                    `;
-                    tbody.appendChild(row);
-
-                    // Also update terminal with summary
-                    const summary = `Epoch ${ep.epoch}: P=${ep.precision} R=${ep.recall} mAP50=${ep.mAP50} mAP50-95=${ep.mAP50_95} box=${ep.box_loss} cls=${ep.cls_loss}\n`;
-                    if (lastEpoch === 1) {
-                        logsEl.textContent = summary;
-                    } else {
-                        logsEl.textContent += summary;
-                    }
-                    logsEl.scrollTop = logsEl.scrollHeight;
+        // Add new epochs to table
+        if (logData.epochs && logData.epochs.length > 0) {
+            const section = document.getElementById('metrics-table-section');
+            section.style.display = 'block';
+            const tbody = document.getElementById('metrics-tbody');
+
+            for (const ep of logData.epochs) {
+                allEpochs.push(ep);
+                lastEpoch = ep.epoch;
+
+                // Add row to table
+                const row = document.createElement('tr');
+                row.innerHTML = `
+                    <td><strong>${ep.epoch}</strong></td>
+                    <td>${ep.box_loss}</td>
+                    <td>${ep.cls_loss}</td>
+                    <td>${ep.dfl_loss}</td>
+                    <td class="${ep.precision > 0.5 ? 'metric-good' : ''}">${ep.precision}</td>
+                    <td class="${ep.recall > 0.5 ? 'metric-good' : ''}">${ep.recall}</td>
+                    <td class="${ep.mAP50 > 0.5 ? 'metric-good' : ''}">${ep.mAP50}</td>
+                    <td class="${ep.mAP50_95 > 0.3 ? 'metric-good' : ''}">${ep.mAP50_95}</td>
+                    <td>${ep.val_box_loss}</td>
+                    <td>${ep.val_cls_loss}</td>
+                    <td>${ep.val_dfl_loss}</td>
+                `;
+                tbody.appendChild(row);
+
+                // Also update terminal with summary
+                const summary = `Epoch ${ep.epoch}: P=${ep.precision} R=${ep.recall} mAP50=${ep.mAP50} mAP50-95=${ep.mAP50_95} box=${ep.box_loss} cls=${ep.cls_loss}\n`;
+                if (lastEpoch === 1) {
+                    logsEl.textContent = summary;
+                } else {
+                    logsEl.textContent += summary;
                 }
-
-                // Update graph
-                drawMetricsGraph(allEpochs);
+                logsEl.scrollTop = logsEl.scrollHeight;
             }
 
-            // Check task completion
-            const status = await API.getTaskStatus(taskId);
-            if (status.status === 'completed') {
-                const now = new Date().toLocaleTimeString();
-                logsEl.textContent += `\n[${now}] Training completed!\n`;
-                if (status.result) {
-                    logsEl.textContent += `Model: ${status.result.model_path || 'N/A'}\n`;
-                    logsEl.textContent += `Images used: ${status.result.num_images || 'N/A'}\n`;
-                }
-                clearInterval(trainingLogInterval);
-                trainingLogInterval = null;
-                loadReadiness();
-            } else if (status.status === 'failed') {
-                const now = new Date().toLocaleTimeString();
-                logsEl.textContent += `\n[${now}] Training FAILED\n`;
-                if (status.error) logsEl.textContent += `Error: ${status.error}\n`;
-                if (status.result && status.result.message) logsEl.textContent += `${status.result.message}\n`;
-                clearInterval(trainingLogInterval);
-                trainingLogInterval = null;
+            // Update graph
+            drawMetricsGraph(allEpochs);
+        }
+    }
+
+    function handleStatus(status) {
+        if (status.status === 'completed') {
+            const now = new Date().toLocaleTimeString();
+            logsEl.textContent += `\n[${now}] ${label} completed!\n`;
+            if (status.result && status.result.model_path) {
+                logsEl.textContent += `Model: ${status.result.model_path}\n`;
+                logsEl.textContent += `Images used: ${status.result.num_images || 'N/A'}\n`;
+            } else if (status.result && status.result.message) {
+                logsEl.textContent += `${status.result.message}\n`;
             }
-        } catch (e) {
-            // ignore polling errors
+            stopLogPolling();
+            loadReadiness();
+        } else if (status.status === 'failed') {
+            const now = new Date().toLocaleTimeString();
+            logsEl.textContent += `\n[${now}] ${label} FAILED\n`;
+            if (status.error) logsEl.textContent += `Error: ${status.error}\n`;
+            if (status.result && status.result.message) logsEl.textContent += `${status.result.message}\n`;
+            stopLogPolling();
+        } else if (status.status !== 'pending' && status.status !== 'running') {
+            const now = new Date().toLocaleTimeString();
+            logsEl.textContent += `\n[${now}] ${label} status: ${status.status}\n`;
+            stopLogPolling();
         }
-    }, 3000);
+    }
+
+    function poll() {
+        trainingLogInterval = setInterval(async () => {
+            try {
+                await fetchLogs();
+                handleStatus(await API.getTaskStatus(taskId));
+            } catch (e) {
+                // ignore polling errors
+            }
+        }, 3000);
+    }
+
+    if (!window.EventSource) { poll(); return; }
+
+    // Each pushed status (one per finished epoch) triggers a metrics fetch;
+    // updates are chained so two fetches never append the same epochs
+    let pending = Promise.resolve();
+    const stream = API.streamTaskStatus(
+        taskId,
+        (status) => {
+            pending = pending
+                .then(fetchLogs)
+                .catch(() => { /* ignore fetch errors */ })
+                .then(() => { if (trainingStatusStream === stream) handleStatus(status); });
+        },
+        () => { if (trainingStatusStream === stream) { trainingStatusStream = null; poll(); } }
+    );
+    trainingStatusStream = stream;
 }
 
 function drawMetricsGraph(data) {